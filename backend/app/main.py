@@ -10,9 +10,13 @@ from .routes.grades import router as grades_router
 from .routes.auth import router as auth_router
 from .routes.users import router as users_router
 from .auth.session_manager import session_manager
+from .services.shared_services import openai_categorizer, category_lookup, local_classifier
+from .services.cache_warmup import CACHE_WARMUP_ON_STARTUP, warm_up_in_background
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+import asyncio
 import subprocess
 import sys
 
@@ -52,7 +56,29 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
         return response
 
-app = FastAPI(title="Grade Calculator API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    openai_categorizer.start_background_expiry()
+    # Answer from the last lookup table snapshot until the warm-up has rebuilt it
+    category_lookup.load_snapshot()
+    local_classifier.load()
+    # Seed the caches from saved calculations without holding up startup
+    warmup_task = asyncio.create_task(warm_up_in_background(openai_categorizer, category_lookup)) if CACHE_WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    openai_categorizer.stop_background_expiry()
+    # Make sure every paid OpenAI result queued for the disk cache is written before exiting
+    try:
+        await asyncio.to_thread(openai_categorizer.close)
+    except Exception as e:
+        print(f"Error flushing OpenAI cache on shutdown: {e}", file=sys.stderr)
+    try:
+        await openai_categorizer.aclose()
+    except Exception as e:
+        print(f"Error closing OpenAI client on shutdown: {e}", file=sys.stderr)
+
+app = FastAPI(title="Grade Calculator API", lifespan=lifespan)
 
 # Generate a random secret key for session middleware
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
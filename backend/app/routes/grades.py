@@ -2,26 +2,32 @@
 Controls grade routes.
 """
 from fastapi import APIRouter, HTTPException, Request, Body, Header, Depends
-from fastapi.responses import JSONResponse
-from typing import List, Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 import json
 from datetime import datetime
 from datetime import timedelta
 import time
+import os
 
 from ..database.database import get_db
 from ..database.models import SavedCalculation, Category, User
 from ..models.grade_models import Assignment
-from ..services.grade_parser import parse_blackboard_grades
+from ..services.grade_parser import parse_blackboard_grades, stream_blackboard_grades, stream_categorization_updates
+from ..services.category_matcher import get_match_cache_stats, clear_match_cache
+from ..services.category_lookup import confirmed_assignments
 from ..services.openai_integration import OpenAICategorizer
-from ..services.shared_services import openai_categorizer
+from ..services.shared_services import openai_categorizer, result_cache, category_lookup, local_classifier, user_category_index
 from ..auth.session_manager import session_manager
 from ..utils.timezone_utils import convert_utc_to_timezone, format_datetime_for_response
 
 router = APIRouter()
 
+# Time budget of a grade calculation, OpenAI categorization falls back to the rules once it is used up
+CALCULATE_DEADLINE_SECONDS = float(os.getenv("CALCULATE_DEADLINE_SECONDS", "10"))
+
 # Helper function to get user's timezone
 def get_user_timezone(db: Session, user_id: int) -> str:
     user = db.query(User).filter(User.id == user_id).first()
@@ -29,14 +35,33 @@ def get_user_timezone(db: Session, user_id: int) -> str:
         return "UTC"
     return user.timezone or "UTC"
 
+def get_user_categories(request: Request, db: Session) -> Tuple[Dict[str, str], Optional[str], bool]:
+    """
+    The logged-in user's past categorizations, the result cache scope they imply,
+    and whether the result cache can be used (not when the scope of a user's results is unknown).
+    Anonymous requests get no index and share the unscoped cache.
+    """
+    try:
+        user_id = session_manager.get_user_id(request)
+        if not user_id:
+            return {}, None, True
+        user_categories = user_category_index.load(user_id, db)
+        scope = user_category_index.cache_scope(user_id, user_categories)
+        return user_categories, scope, scope is not None or not user_categories
+    except Exception as e:
+        print(f"Error loading user categories: {str(e)}")
+        return {}, None, True
+
 @router.post("/calculate/raw", 
     status_code=200,
     description="Calculate grades from raw Blackboard data")
 async def calculate_grades_raw(
     request: Request,
     raw_data: str = Body(..., media_type="text/plain"),
-    x_grade_categories: Optional[str] = Header(None)
+    x_grade_categories: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
 ):
+    deadline = time.monotonic() + CALCULATE_DEADLINE_SECONDS
     try:
         # Log cache statistics before processing
         cache_stats_before = openai_categorizer.get_cache_stats()
@@ -50,8 +75,18 @@ async def calculate_grades_raw(
             except json.JSONDecodeError:
                 print("Error decoding categories header")
         
+        user_categories, cache_scope, use_result_cache = get_user_categories(request, db)
+        
+        # Repeated pastes are answered straight from the result cache
+        cache_key = result_cache.make_key(raw_data, available_categories, scope=cache_scope)
+        cached_response = result_cache.get(cache_key) if use_result_cache else None
+        if cached_response is not None:
+            print("Result cache hit, skipping parsing and categorization")
+            return Response(content=cached_response, media_type="application/json", headers={"X-Cache": "HIT"})
+        
         # Process the grades with available categories
-        assignments = await parse_blackboard_grades(raw_data, available_categories)
+        assignments = await parse_blackboard_grades(raw_data, available_categories, deadline=deadline,
+                                                    user_categories=user_categories)
         
         # Log cache statistics after processing to see if cache was used
         cache_stats_after = openai_categorizer.get_cache_stats()
@@ -75,17 +110,161 @@ async def calculate_grades_raw(
         print(f"Total points possible: {total_points_possible}")
         print(f"Overall grade: {overall_grade}%")
         
-        return JSONResponse({
+        response = JSONResponse({
             "assignments": [a.dict() for a in assignments],
             "overall_grade": overall_grade,
             "total_points_earned": total_points_earned,
             "total_points_possible": total_points_possible
-        })
+        }, headers={"X-Cache": "MISS"})
+        # Don't pin results degraded by a provider incident or the deadline for the cache TTL
+        if use_result_cache and openai_categorizer.circuit_breaker.is_closed and time.monotonic() < deadline:
+            result_cache.set(cache_key, response.body.decode("utf-8"))
+        
+        return response
         
     except Exception as e:
         print("Error processing grades:", str(e))
         raise HTTPException(status_code=400, detail=str(e))
     
+@router.post("/calculate/raw/stream",
+    status_code=200,
+    description="Calculate grades from raw Blackboard data, streaming the request body and the parsed assignments")
+async def calculate_grades_raw_stream(
+    request: Request,
+    x_grade_categories: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    # Parse categories from header if present
+    available_categories = None
+    if x_grade_categories:
+        try:
+            available_categories = json.loads(x_grade_categories)
+        except json.JSONDecodeError:
+            print("Error decoding categories header")
+
+    user_categories, _, _ = get_user_categories(request, db)
+
+    async def generate_results():
+        # One JSON document per line: each assignment as soon as it is parsed, then the totals
+        total_points_earned = 0.0
+        total_points_possible = 0.0
+        assignment_count = 0
+        try:
+            async for assignment in stream_blackboard_grades(request.stream(), available_categories,
+                                                             deadline=time.monotonic() + CALCULATE_DEADLINE_SECONDS,
+                                                             user_categories=user_categories):
+                assignment_count += 1
+                if assignment.status == "GRADED":
+                    total_points_earned += assignment.score
+                    total_points_possible += assignment.total_points
+                yield json.dumps({"assignment": assignment.dict()}, default=str) + "\n"
+        except Exception as e:
+            print("Error streaming grades:", str(e))
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+
+        if not assignment_count:
+            yield json.dumps({"error": "No valid assignments could be parsed from the input data"}) + "\n"
+            return
+
+        overall_grade = (total_points_earned / total_points_possible * 100) if total_points_possible > 0 else 0
+        print(f"Successfully streamed {assignment_count} assignments")
+        yield json.dumps({
+            "summary": {
+                "assignment_count": assignment_count,
+                "overall_grade": overall_grade,
+                "total_points_earned": total_points_earned,
+                "total_points_possible": total_points_possible
+            }
+        }) + "\n"
+
+    return StreamingResponse(generate_results(), media_type="application/x-ndjson")
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/calculate/raw/events",
+    status_code=200,
+    description="Calculate grades from raw Blackboard data, sending rule-based results at once and refined categories as Server-Sent Events")
+async def calculate_grades_raw_events(
+    request: Request,
+    raw_data: str = Body(..., media_type="text/plain"),
+    x_grade_categories: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    # Parse categories from header if present
+    available_categories = None
+    if x_grade_categories:
+        try:
+            available_categories = json.loads(x_grade_categories)
+        except json.JSONDecodeError:
+            print("Error decoding categories header")
+
+    deadline = time.monotonic() + CALCULATE_DEADLINE_SECONDS
+    user_categories, cache_scope, use_result_cache = get_user_categories(request, db)
+    cache_key = result_cache.make_key(raw_data, available_categories, scope=cache_scope)
+
+    async def generate_events():
+        # Repeated pastes are answered straight from the result cache, already final
+        cached_response = result_cache.get(cache_key) if use_result_cache else None
+        if cached_response is not None:
+            yield _sse_event("assignments", {**json.loads(cached_response), "pending": 0})
+            yield _sse_event("done", {"updated": 0})
+            return
+
+        assignments = []
+        updated = 0
+        try:
+            async for event, payload, pending in stream_categorization_updates(raw_data, available_categories, deadline=deadline,
+                                                                                 user_categories=user_categories):
+                if event == "assignments":
+                    assignments = payload
+                    if not assignments:
+                        yield _sse_event("error", {"detail": "No valid assignments could be parsed from the input data"})
+                        return
+
+                    # Totals don't depend on categories, so they are final in the first event
+                    total_points_earned = sum(a.score for a in assignments if a.status == "GRADED")
+                    total_points_possible = sum(a.total_points for a in assignments if a.status == "GRADED")
+                    overall_grade = (total_points_earned / total_points_possible * 100) if total_points_possible > 0 else 0
+                    yield _sse_event("assignments", {
+                        "assignments": [a.dict() for a in assignments],
+                        "overall_grade": overall_grade,
+                        "total_points_earned": total_points_earned,
+                        "total_points_possible": total_points_possible,
+                        "pending": pending
+                    })
+                else:
+                    updated += len(payload)
+                    yield _sse_event("update", {
+                        "updates": [{"index": index, "assignment": assignment.dict()} for index, assignment in payload],
+                        "pending": pending
+                    })
+        except Exception as e:
+            print("Error streaming grade events:", str(e))
+            yield _sse_event("error", {"detail": str(e)})
+            return
+
+        print(f"Successfully streamed {len(assignments)} assignments, {updated} refined by OpenAI")
+        yield _sse_event("done", {"updated": updated})
+
+        # Store the final result like /calculate/raw does, unless it was degraded
+        if use_result_cache and openai_categorizer.circuit_breaker.is_closed and time.monotonic() < deadline:
+            response = JSONResponse({
+                "assignments": [a.dict() for a in assignments],
+                "overall_grade": overall_grade,
+                "total_points_earned": total_points_earned,
+                "total_points_possible": total_points_possible
+            })
+            result_cache.set(cache_key, response.body.decode("utf-8"))
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/save")
 async def save_calculation(
     request: Request,
@@ -129,6 +308,11 @@ async def save_calculation(
         db.commit()
         db.refresh(new_calculation)
         
+        # Later pastes pick up the categories chosen here, everyone's pastes through the anonymous vote table
+        user_category_index.update(user_id, calculation_data.get("categories", []))
+        if calculation_data.get("calculation_mode", "blackboard") == "blackboard":
+            category_lookup.add_calculation(confirmed_assignments(calculation_data.get("categories", [])), voter=user_id)
+        
         return JSONResponse({
             "id": new_calculation.id,
             "message": "Calculation saved successfully"
@@ -504,6 +688,9 @@ async def delete_calculation(
         db.delete(calculation)
         db.commit()
         
+        # Its choices no longer answer later pastes
+        user_category_index.rebuild(user_id, db)
+        
         return {"message": "Calculation deleted successfully"}
         
     except Exception as e:
@@ -566,6 +753,9 @@ async def update_calculation(
             
         db.refresh(calculation)
         
+        # Rebuilt rather than merged, so assignments removed or moved here stop answering later pastes
+        user_category_index.rebuild(user_id, db)
+        
         # Return the complete updated calculation
         return {
             "id": calculation.id,
@@ -802,6 +992,13 @@ async def get_cache_stats(
         stats = openai_categorizer.get_cache_stats()
         return JSONResponse({
             "cache_stats": stats,
+            "result_cache_stats": result_cache.get_stats(),
+            "rule_match_cache_stats": get_match_cache_stats(),
+            "batching_stats": openai_categorizer.batcher.get_stats(),
+            "rate_limiter_stats": openai_categorizer.rate_limiter.get_stats(),
+            "circuit_breaker_stats": openai_categorizer.circuit_breaker.get_stats(),
+            "category_lookup_stats": category_lookup.get_stats(),
+            "local_classifier_stats": local_classifier.get_stats(),
             "timestamp": datetime.now().isoformat()
         })
     except Exception as e:
@@ -818,6 +1015,9 @@ async def clear_cache(
     """Clear the OpenAI categorization cache."""
     try:
         openai_categorizer.clear_cache()
+        removed_results = result_cache.clear()
+        clear_match_cache()
+        print(f"Removed {removed_results} cached calculation results")
         return JSONResponse({
             "message": "Cache cleared successfully",
             "timestamp": datetime.now().isoformat()
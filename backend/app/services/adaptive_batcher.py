@@ -0,0 +1,160 @@
+"""
+Adaptive batching for OpenAI categorization.
+Packs pending assignments into requests that fit a token budget, and learns from observed response times
+which batch size gives the lowest latency per assignment while keeping each request under a latency target.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+import os
+import threading
+
+# Rough size of a request, 1 token is ~4 characters of English text
+CHARS_PER_TOKEN = 4
+# Fixed instructions of the categorization prompt, plus per-item overhead in the prompt and the answer
+PROMPT_BASE_TOKENS = 250
+ITEM_PROMPT_OVERHEAD_TOKENS = 8
+ITEM_RESPONSE_TOKENS = 30
+
+OPENAI_BATCH_TOKEN_BUDGET = int(os.getenv("OPENAI_BATCH_TOKEN_BUDGET", "2500"))
+OPENAI_BATCH_LATENCY_TARGET_SECONDS = float(os.getenv("OPENAI_BATCH_LATENCY_TARGET_SECONDS", "8"))
+
+# Batch sizes the batcher chooses between, and the one used before anything has been observed
+CANDIDATE_BATCH_SIZES = (1, 2, 3, 5, 8, 10, 15, 20)
+DEFAULT_BATCH_SIZE = 5
+
+# Weight of the newest observation in the moving averages
+LATENCY_SMOOTHING = 0.3
+# Observations of a size before it is trusted, neighbours of the current best are explored until then
+MIN_SAMPLES = 3
+# Requests recorded while exploring a size, none of them that size, before falling back to the best observed size;
+# traffic may never fill a larger batch
+EXPLORE_WINDOW = 10
+# Requests after which a size given up on is explored again
+EXPLORE_RETRY = 200
+
+T = TypeVar('T')
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Cheap token estimate, good enough for budgeting requests"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class AdaptiveBatcher:
+    """Chooses how many assignments go into one OpenAI request"""
+
+    def __init__(self,
+                 token_budget: int = OPENAI_BATCH_TOKEN_BUDGET,
+                 latency_target: float = OPENAI_BATCH_LATENCY_TARGET_SECONDS,
+                 candidate_sizes: Sequence[int] = CANDIDATE_BATCH_SIZES,
+                 default_size: int = DEFAULT_BATCH_SIZE):
+        self.token_budget = token_budget
+        self.latency_target = latency_target
+        self.candidate_sizes = tuple(sorted(candidate_sizes))
+        self.default_size = default_size
+        # size -> (moving average of request latency in seconds, number of observations)
+        self._latency: Dict[int, Tuple[float, int]] = {}
+        # Requests recorded so far, and size -> (requests recorded, its observations) when exploring it started
+        self._records = 0
+        self._exploring: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, batch_size: int, seconds: float) -> None:
+        """Record the latency of a request that categorized batch_size assignments"""
+        if batch_size <= 0:
+            return
+        size = self._bucket(batch_size)
+        with self._lock:
+            self._records += 1
+            if size in self._latency:
+                average, samples = self._latency[size]
+                self._latency[size] = (average + LATENCY_SMOOTHING * (seconds - average), samples + 1)
+            else:
+                self._latency[size] = (seconds, 1)
+
+    def target_size(self) -> int:
+        """Batch size to use for the next request"""
+        with self._lock:
+            latency = dict(self._latency)
+
+        def within_target(size: int) -> bool:
+            return latency[size][0] <= self.latency_target
+
+        trusted = [size for size in latency if latency[size][1] >= MIN_SAMPLES and within_target(size)]
+        if not trusted:
+            best = self.default_size
+        else:
+            # Lowest latency per assignment among sizes that keep requests under the target
+            best = min(trusted, key=lambda size: latency[size][0] / size)
+
+        best = self._bucket(best)
+        if best not in latency or latency[best][1] < MIN_SAMPLES:
+            return best
+
+        # Explore the neighbouring sizes of a trusted best until they have enough observations
+        index = self.candidate_sizes.index(best)
+        for neighbour_index in (index + 1, index - 1):
+            if 0 <= neighbour_index < len(self.candidate_sizes):
+                neighbour = self.candidate_sizes[neighbour_index]
+                observed = latency.get(neighbour)
+                samples = observed[1] if observed else 0
+                if samples < MIN_SAMPLES and self._keep_exploring(neighbour, samples):
+                    return neighbour
+        return best
+
+    def _keep_exploring(self, size: int, samples: int) -> bool:
+        """Whether to (still) try a size, given up on when EXPLORE_WINDOW requests went by without observing it"""
+        with self._lock:
+            started = self._exploring.get(size)
+            # Not tried yet, observed since the last check, or given up on long enough ago: (re)start the window
+            if started is None or started[1] != samples or self._records - started[0] >= EXPLORE_RETRY:
+                self._exploring[size] = (self._records, samples)
+                return True
+            return self._records - started[0] < EXPLORE_WINDOW
+
+    def pack(self,
+             items: Iterable[T],
+             available_categories: Optional[List[str]] = None,
+             key=None) -> List[List[T]]:
+        """
+        Split items into batches of at most target_size() items whose estimated tokens fit the budget.
+        key maps an item to its (name, type) pair, items are used directly if it is omitted.
+        Every batch holds at least one item, even if that item alone is over budget.
+        """
+        max_items = self.target_size()
+        base_tokens = PROMPT_BASE_TOKENS + sum(
+            estimate_tokens(category) + ITEM_PROMPT_OVERHEAD_TOKENS for category in (available_categories or [])
+        )
+
+        batches: List[List[T]] = []
+        batch: List[T] = []
+        batch_tokens = base_tokens
+        for item in items:
+            name, type_ = key(item) if key else item
+            item_tokens = estimate_tokens(name) + estimate_tokens(type_) + ITEM_PROMPT_OVERHEAD_TOKENS + ITEM_RESPONSE_TOKENS
+            if batch and (len(batch) >= max_items or batch_tokens + item_tokens > self.token_budget):
+                batches.append(batch)
+                batch = []
+                batch_tokens = base_tokens
+            batch.append(item)
+            batch_tokens += item_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _bucket(self, batch_size: int) -> int:
+        """Map an observed batch size to the nearest candidate size"""
+        return min(self.candidate_sizes, key=lambda size: (abs(size - batch_size), size))
+
+    def get_stats(self) -> dict:
+        """Return the learned latencies and the current batch size"""
+        with self._lock:
+            latency = dict(self._latency)
+        return {
+            "target_batch_size": self.target_size(),
+            "token_budget": self.token_budget,
+            "latency_target_seconds": self.latency_target,
+            "observed": {
+                str(size): {"avg_latency_seconds": round(average, 3), "samples": samples}
+                for size, (average, samples) in sorted(latency.items())
+            }
+        }
@@ -0,0 +1,132 @@
+"""
+Line-oriented tokenizer for raw Blackboard grade data.
+Walks the normalized lines once and emits one row per assignment block, so parsing stays linear in the size of the paste.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional
+import re
+
+# Each optional/required line of an assignment block, matched against a whole (stripped) line
+DUE_LINE = re.compile(r'Due:[^\n]+')
+TYPE_LINE = re.compile(r'Assignment|Discussion|Test|Blog|Quiz|Exam')
+DATE_LINE = re.compile(r'[A-Za-z]+ \d{1,2}, \d{4}(?:[^\n]*(?:AM|PM))?')
+STATUS_LINE = re.compile(r'Graded|Upcoming')
+SCORE_LINE = re.compile(r'\s*-|\s*[0-9.]+')
+# Only the start of the total line is part of the block, anything after it can begin the next one
+TOTAL_PREFIX = re.compile(r'/(?P<total>[0-9.]+)')
+
+# Longest possible block: name, due, type, date, status, score, total
+MAX_BLOCK_LINES = 7
+
+@dataclass
+class BlackboardRow:
+    """Raw fields of a single assignment block"""
+    name: str
+    status: str
+    score: str
+    total: str
+    assignment_type: Optional[str] = None
+
+class BlackboardTokenizer:
+    """
+    Incremental state machine over the lines of a Blackboard paste.
+    Lines can be fed one at a time; completed blocks are returned as soon as their total line arrives.
+    Only a window of at most MAX_BLOCK_LINES lines is ever held.
+    """
+
+    _NEED_MORE = object()
+
+    def __init__(self):
+        self._window: Deque[str] = deque()
+
+    def feed(self, line: str) -> List[BlackboardRow]:
+        """Add a raw line and return any blocks it completes"""
+        line = line.strip()
+        if not line:
+            return []
+        self._window.append(line)
+        return self._drain(final=False)
+
+    def finish(self) -> List[BlackboardRow]:
+        """Signal end of input and return any remaining blocks"""
+        rows = self._drain(final=True)
+        self._window.clear()
+        return rows
+
+    def _drain(self, final: bool) -> List[BlackboardRow]:
+        rows = []
+        while self._window:
+            result = self._match_block(final)
+            if result is self._NEED_MORE:
+                break
+            if result is None:
+                # No block starts at this line, move on to the next one
+                self._window.popleft()
+                continue
+
+            row, consumed, remainder = result
+            for _ in range(consumed):
+                self._window.popleft()
+            if remainder:
+                self._window.appendleft(remainder)
+            rows.append(row)
+        return rows
+
+    def _match_block(self, final: bool):
+        """
+        Try to match a block starting at the first line of the window.
+        Returns (row, lines_consumed, remainder), None if no block starts here,
+        or _NEED_MORE if more lines are required to decide.
+        """
+        window = self._window
+        size = len(window)
+        index = 1
+
+        def available(i: int) -> bool:
+            return i < size
+
+        # Optional lines, in the order Blackboard prints them
+        for optional_line in (DUE_LINE, TYPE_LINE, DATE_LINE):
+            if not available(index):
+                return None if final else self._NEED_MORE
+            if optional_line.fullmatch(window[index]):
+                index += 1
+
+        if not available(index):
+            return None if final else self._NEED_MORE
+        status_index = index
+        if not STATUS_LINE.fullmatch(window[status_index]):
+            return None
+
+        if not available(index + 1):
+            return None if final else self._NEED_MORE
+        score = window[index + 1]
+        if not SCORE_LINE.fullmatch(score):
+            return None
+
+        if not available(index + 2):
+            return None if final else self._NEED_MORE
+        total_line = window[index + 2]
+        total_match = TOTAL_PREFIX.match(total_line)
+        if not total_match:
+            return None
+
+        # The line right before the status decides whether this is a test
+        assignment_type = 'Test' if 'Test' in window[status_index - 1] else None
+
+        row = BlackboardRow(
+            name=window[0],
+            status=window[status_index],
+            score=score,
+            total=total_match.group('total'),
+            assignment_type=assignment_type
+        )
+        return row, index + 3, total_line[total_match.end():]
+
+def tokenize_blackboard_text(raw_text: str) -> Iterator[BlackboardRow]:
+    """Tokenize a complete Blackboard paste in a single pass"""
+    tokenizer = BlackboardTokenizer()
+    for line in raw_text.splitlines():
+        yield from tokenizer.feed(line)
+    yield from tokenizer.finish()
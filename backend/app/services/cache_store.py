@@ -0,0 +1,121 @@
+"""
+Persistent, crash-safe store for OpenAI categorization results.
+Every result is written as its own row in a SQLite database (WAL mode) by a background thread,
+so the request path only enqueues, and nothing already paid for is lost if the process dies.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import json
+import queue
+import sqlite3
+import threading
+
+CacheResult = Tuple[Optional[str], float, List[str]]
+
+# Upper bound of rows committed per transaction by the writer thread
+WRITE_BATCH_SIZE = 100
+
+class CategorizationCacheStore:
+    """SQLite backed key/value store with a single background writer"""
+
+    _CLEAR = object()
+    _STOP = object()
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS categorizations ("
+                "key TEXT PRIMARY KEY, created_at REAL NOT NULL, result TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self, ttl: timedelta) -> Dict[str, Tuple[datetime, CacheResult]]:
+        """Return every unexpired entry and prune the expired ones"""
+        cutoff = (datetime.now() - ttl).timestamp()
+        entries = {}
+        with self._connect() as conn:
+            conn.execute("DELETE FROM categorizations WHERE created_at < ?", (cutoff,))
+            for key, created_at, result in conn.execute("SELECT key, created_at, result FROM categorizations"):
+                try:
+                    category, confidence, reasons = json.loads(result)
+                except (ValueError, TypeError):
+                    continue
+                entries[key] = (datetime.fromtimestamp(created_at), (category, confidence, reasons))
+        return entries
+
+    def put(self, key: str, timestamp: datetime, result: CacheResult) -> None:
+        """Queue a result for writing, never blocks on disk"""
+        self._ensure_writer()
+        self._queue.put((key, timestamp.timestamp(), json.dumps(list(result))))
+
+    def clear(self) -> None:
+        """Queue removal of every stored entry"""
+        self._ensure_writer()
+        self._queue.put(self._CLEAR)
+
+    def flush(self) -> None:
+        """Block until everything queued so far is on disk"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is None:
+            return
+        self._queue.put(self._STOP)
+        writer.join()
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="categorization-cache-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                items = [self._queue.get()]
+                # Group whatever else is already queued into the same transaction
+                while len(items) < WRITE_BATCH_SIZE:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = False
+                try:
+                    with conn:
+                        for item in items:
+                            if item is self._STOP:
+                                stop = True
+                            elif item is self._CLEAR:
+                                conn.execute("DELETE FROM categorizations")
+                            else:
+                                conn.execute(
+                                    "INSERT OR REPLACE INTO categorizations (key, created_at, result) VALUES (?, ?, ?)",
+                                    item
+                                )
+                except sqlite3.Error as e:
+                    print(f"Error writing categorization cache: {str(e)}")
+                finally:
+                    for _ in items:
+                        self._queue.task_done()
+
+                if stop:
+                    return
+        finally:
+            conn.close()
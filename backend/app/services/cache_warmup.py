@@ -0,0 +1,163 @@
+"""
+Warms the categorization caches from saved calculations.
+Every saved category holds assignments a user confirmed; they are votes in the name -> category lookup table.
+The OpenAI categorization cache is keyed on name templates, so it is then seeded with the template answers of the
+finished table (under the category set of each calculation, like a live request); one user's choice, or one name,
+never becomes the shared answer for a whole series.
+Runs in the background on startup, or by hand: python -m app.services.cache_warmup [--limit N],
+which also writes the lookup table snapshot servers load at startup.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
+import argparse
+import asyncio
+import os
+
+from ..database.database import SessionLocal
+from ..database.models import Category, SavedCalculation
+from .category_lookup import CategoryLookup, confirmed_assignments, series_key
+
+CACHE_WARMUP_ON_STARTUP = os.getenv("CACHE_WARMUP_ON_STARTUP", "true").lower() == "true"
+# Most recent saved calculations read by a warm-up
+CACHE_WARMUP_MAX_CALCULATIONS = int(os.getenv("CACHE_WARMUP_MAX_CALCULATIONS", "5000"))
+
+# Rows fetched per round trip while scanning
+QUERY_BATCH_SIZE = 500
+# Calculations seeded between yields to the event loop during a background warm-up
+SEED_SLICE_SIZE = 100
+
+@dataclass
+class ConfirmedCalculation:
+    """User who saved a calculation, its category names and its (name, type, category) assignments"""
+    user_id: Optional[int] = None
+    categories: List[str] = field(default_factory=list)
+    assignments: List[Tuple[str, Optional[str], str]] = field(default_factory=list)
+
+def collect_confirmed_assignments(db, limit: int = CACHE_WARMUP_MAX_CALCULATIONS) -> List[ConfirmedCalculation]:
+    """
+    Scan saved categories in bulk, most recent calculations first.
+    Only Blackboard calculations are used, and hypothetical assignments are skipped since users made them up.
+    Blocking, run it in a thread from async code.
+    """
+    query = (
+        db.query(SavedCalculation.id, SavedCalculation.user_id, SavedCalculation.results, Category.name, Category.assignments)
+        .join(Category, Category.calculation_id == SavedCalculation.id)
+        .order_by(SavedCalculation.created_at.desc(), SavedCalculation.id.desc())
+        .yield_per(QUERY_BATCH_SIZE)
+    )
+
+    calculations: List[ConfirmedCalculation] = []
+    current_id = None
+    current: Optional[ConfirmedCalculation] = None
+    for calculation_id, user_id, results, category_name, assignments in query:
+        if calculation_id != current_id:
+            current_id = calculation_id
+            current = None
+            if (results or {}).get("calculation_mode", "blackboard") == "blackboard":
+                if len(calculations) >= limit:
+                    break
+                current = ConfirmedCalculation(user_id=user_id)
+                calculations.append(current)
+
+        if current is None or not category_name:
+            continue
+
+        current.categories.append(category_name)
+        current.assignments.extend(confirmed_assignments([{"name": category_name, "assignments": assignments}]))
+
+    return calculations
+
+def _add_votes(calculations: List[ConfirmedCalculation], lookup: CategoryLookup) -> None:
+    """Count the confirmed assignments in the lookup table, each as a vote of the user who saved them"""
+    for calculation in calculations:
+        lookup.add_calculation(calculation.assignments, voter=calculation.user_id)
+
+def _seed(calculations: List[ConfirmedCalculation], categorizer, lookup: CategoryLookup, persist: bool,
+          seen: Set[tuple]) -> int:
+    """
+    Seed the categorization cache with the template answers of the finished lookup table, returns how many were seeded.
+    Templates without enough agreeing votes are left to the live categorization.
+    """
+    seeded = 0
+    for calculation in calculations:
+        for name, assignment_type, _ in calculation.assignments:
+            key = (series_key(name, assignment_type), tuple(sorted(calculation.categories)))
+            if key in seen:
+                continue
+            seen.add(key)
+            answer = lookup.template_lookup(name, assignment_type, calculation.categories)
+            if answer is None:
+                continue
+            category, confidence, reasons = answer
+            result = (categorizer.sanitize_input(category), confidence, reasons)
+            categorizer.seed_cache(name, assignment_type, calculation.categories, result, persist=persist)
+            seeded += 1
+    return seeded
+
+def warm_up_caches(db, categorizer, lookup: CategoryLookup,
+                   limit: int = CACHE_WARMUP_MAX_CALCULATIONS, persist: bool = True) -> dict:
+    """Synchronous warm-up, persisting the seeded entries to the disk and shared caches by default"""
+    lookup.begin_rebuild()
+    try:
+        # Oldest first, so a user's most recent save is the vote that counts
+        calculations = collect_confirmed_assignments(db, limit)[::-1]
+        fresh_lookup = CategoryLookup()
+        _add_votes(calculations, fresh_lookup)
+        seeded = _seed(calculations, categorizer, fresh_lookup, persist, set())
+        lookup.replace(fresh_lookup)
+    finally:
+        lookup.abort_rebuild()
+    return {"calculations": len(calculations), "assignments_seeded": seeded, "lookup": lookup.get_stats()}
+
+async def warm_up_in_background(categorizer, lookup: CategoryLookup, limit: int = CACHE_WARMUP_MAX_CALCULATIONS) -> None:
+    """Startup warm-up: reads the database in a thread and seeds memory only, yielding to requests as it goes"""
+    def collect() -> List[ConfirmedCalculation]:
+        db = SessionLocal()
+        try:
+            return collect_confirmed_assignments(db, limit)
+        finally:
+            db.close()
+
+    # Saves arriving while the table is rebuilt vote into the live one, replace() carries them over
+    lookup.begin_rebuild()
+    try:
+        calculations = (await asyncio.to_thread(collect))[::-1]
+        fresh_lookup = CategoryLookup()
+        for i in range(0, len(calculations), SEED_SLICE_SIZE):
+            _add_votes(calculations[i:i + SEED_SLICE_SIZE], fresh_lookup)
+            await asyncio.sleep(0)
+        seeded = 0
+        seen: Set[tuple] = set()
+        for i in range(0, len(calculations), SEED_SLICE_SIZE):
+            seeded += _seed(calculations[i:i + SEED_SLICE_SIZE], categorizer, fresh_lookup, False, seen)
+            await asyncio.sleep(0)
+        lookup.replace(fresh_lookup)
+        print(f"Cache warm-up seeded {seeded} assignments from {len(calculations)} saved calculations")
+    except Exception as e:
+        # A cold cache only costs OpenAI calls, never fail startup over it
+        print(f"Cache warm-up failed: {str(e)}")
+    finally:
+        # No-op after replace(), stops recording if the warm-up failed or was cancelled
+        lookup.abort_rebuild()
+
+def main():
+    """Seeds the disk and shared categorization caches and writes the lookup table snapshot"""
+    parser = argparse.ArgumentParser(description="Seed the categorization caches from saved calculations")
+    parser.add_argument("--limit", type=int, default=CACHE_WARMUP_MAX_CALCULATIONS,
+                        help="most recent saved calculations to read")
+    args = parser.parse_args()
+
+    from .shared_services import openai_categorizer, category_lookup
+
+    db = SessionLocal()
+    try:
+        stats = warm_up_caches(db, openai_categorizer, category_lookup, limit=args.limit)
+        category_lookup.save_snapshot()
+    finally:
+        db.close()
+        # Wait for the seeded entries to reach the disk store
+        openai_categorizer.close()
+    print(f"Cache warm-up done: {stats}")
+
+if __name__ == "__main__":
+    main()
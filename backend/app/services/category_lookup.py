@@ -0,0 +1,260 @@
+"""
+Lookup table of assignment names users have already filed under a category in their saved calculations.
+Consulted after the rule-based matcher and before OpenAI, so names seen before never cost an API call.
+Besides exact names it keeps anonymous votes per name template ("lab report #"), so a series learned from
+other users' saves also covers members nobody has saved yet.
+Each user has one vote per name and per template, their latest choice, so one user's saves never make an answer.
+Voters are only known by an HMAC of their user id, no user id is held or written to the snapshot.
+The parser and the OpenAI cache use the same templates to categorize a numbered series only once.
+A snapshot of the table is written by the warm-up job and loaded at startup.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+
+# Share of the votes a category needs before the lookup answers for it
+LOOKUP_MIN_SHARE = 0.7
+# Votes, from different users, an exact name needs before the lookup answers for it
+LOOKUP_MIN_VOTES = 2
+# Confidence reported for a unanimous answer, a bit below an explicit user choice
+LOOKUP_MAX_CONFIDENCE = 0.95
+# Template answers generalize from other names, so they count a pseudo-vote against every answer:
+# a template needs 3 unanimous votes to reach LOOKUP_MIN_SHARE, and confidence grows with the number of votes
+TEMPLATE_VOTE_PRIOR = 1
+
+CATEGORY_LOOKUP_SNAPSHOT_PATH = os.getenv(
+    "CATEGORY_LOOKUP_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cache', 'category_lookup.json')
+)
+SNAPSHOT_VERSION = 4
+
+# Key of the voter tokens, without a configured secret tokens only hold within the process and aren't saved
+CATEGORY_LOOKUP_VOTER_SECRET = os.getenv("CATEGORY_LOOKUP_VOTER_SECRET") or os.getenv("SECRET_KEY")
+VOTER_TOKEN_KEY = (CATEGORY_LOOKUP_VOTER_SECRET or secrets.token_urlsafe(32)).encode('utf-8')
+PERSIST_VOTERS = CATEGORY_LOOKUP_VOTER_SECRET is not None
+
+WHITESPACE = re.compile(r'\s+')
+# A number, with a single letter right after it ("lab 3a") masked along with it
+SERIES_NUMBER = re.compile(r'\d+(?:[a-z]\b)?')
+# Trailing parts of a series member that don't change what kind of assignment it is ("hw1.required")
+SERIES_SUFFIXES = ('required', 'optional', 'milestone', 'submission', 'resubmission', 'draft', 'revision', 'checkpoint', 'late')
+SERIES_SUFFIX = re.compile(r'[\s._\-(]+(?:' + '|'.join(SERIES_SUFFIXES) + r')\)?$')
+
+LookupKey = Tuple[str, str]
+ConfirmedAssignment = Tuple[str, Optional[str], str]
+# (voter token, "name" or "template", name or template, type)
+VoterKey = Tuple[str, str, str, str]
+
+NAMES = "name"
+TEMPLATES = "template"
+
+def lookup_key(name: Optional[str], assignment_type: Optional[str]) -> LookupKey:
+    """Case and whitespace insensitive key of an assignment"""
+    return (
+        WHITESPACE.sub(' ', (name or '').strip().lower()),
+        (assignment_type or '').strip().lower()
+    )
+
+def name_template(name: Optional[str]) -> str:
+    """
+    Normalized name with numbers and series suffixes masked,
+    "Lab Report 2" and "lab report 11" share "lab report #", "HW1.required" and "HW9.milestone" share "hw#"
+    """
+    return SERIES_SUFFIX.sub('', SERIES_NUMBER.sub('#', lookup_key(name, None)[0]))
+
+def series_key(name: Optional[str], assignment_type: Optional[str]) -> LookupKey:
+    """(name template, type) shared by the members of a numbered series"""
+    return name_template(name), lookup_key(None, assignment_type)[1]
+
+def confirmed_assignments(categories: Iterable[dict]) -> List[ConfirmedAssignment]:
+    """(name, type, category) of each assignment in saved categories, hypothetical assignments are skipped"""
+    confirmed = []
+    for category in categories or []:
+        category_name = category.get("name")
+        if not category_name:
+            continue
+        for assignment in category.get("assignments") or []:
+            if not isinstance(assignment, dict) or assignment.get("isHypothetical"):
+                continue
+            if assignment.get("name"):
+                confirmed.append((assignment["name"], assignment.get("assignment_type"), category_name))
+    return confirmed
+
+def voter_token(voter: Hashable) -> str:
+    """Opaque stand-in for a user id, stable for as long as the secret"""
+    return hmac.new(VOTER_TOKEN_KEY, str(voter).encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+def _encode_votes(votes: Dict[LookupKey, Counter]) -> Dict[str, Dict[str, int]]:
+    return {"\t".join(key): dict(counter) for key, counter in votes.items()}
+
+def _decode_votes(data: Dict[str, Dict[str, int]]) -> Dict[LookupKey, Counter]:
+    votes: Dict[LookupKey, Counter] = defaultdict(Counter)
+    for key, counter in data.items():
+        name, _, assignment_type = key.partition("\t")
+        votes[(name, assignment_type)] = Counter(counter)
+    return votes
+
+class CategoryLookup:
+    """Votes of saved calculations for each (name, type) and each (name template, type), by lowercased category name"""
+
+    def __init__(self):
+        self._votes: Dict[LookupKey, Counter] = defaultdict(Counter)
+        self._template_votes: Dict[LookupKey, Counter] = defaultdict(Counter)
+        # Category each voter currently votes for, so a later save moves their vote instead of adding one
+        self._voters: Dict[VoterKey, str] = {}
+        # Calculations added while a replacement table is being built, replayed into it by replace()
+        self._journal: Optional[List[Tuple[List[ConfirmedAssignment], Optional[Hashable]]]] = None
+
+    def _vote(self, kind: str, key: LookupKey, category: str, voter: Optional[Hashable]) -> None:
+        votes = self._votes if kind == NAMES else self._template_votes
+        if voter is not None:
+            voter_key = (voter_token(voter), kind, *key)
+            previous = self._voters.get(voter_key)
+            if previous == category:
+                return
+            if previous is not None:
+                votes[key][previous] -= 1
+                if votes[key][previous] <= 0:
+                    del votes[key][previous]
+            self._voters[voter_key] = category
+        votes[key][category] += 1
+
+    def add(self, name: Optional[str], assignment_type: Optional[str], category: str,
+            voter: Optional[Hashable] = None) -> None:
+        if not name or not category:
+            return
+        self._vote(NAMES, lookup_key(name, assignment_type), category.strip().lower(), voter)
+
+    def add_calculation(self, assignments: Iterable[ConfirmedAssignment], voter: Optional[Hashable] = None) -> None:
+        """
+        Count the assignments of one saved calculation, voter is the user who saved it.
+        Each name gets a vote, each template only one per calculation, so a single long series doesn't outvote other users.
+        A template the calculation files under several categories gets no vote from it.
+        """
+        assignments = list(assignments)
+        if self._journal is not None:
+            self._journal.append((assignments, voter))
+        templates: Dict[LookupKey, set] = defaultdict(set)
+        for name, assignment_type, category in assignments:
+            if not name or not category:
+                continue
+            self.add(name, assignment_type, category, voter)
+            templates[series_key(name, assignment_type)].add(category.strip().lower())
+        for template, categories in templates.items():
+            if len(categories) == 1:
+                self._vote(TEMPLATES, template, next(iter(categories)), voter)
+
+    def begin_rebuild(self) -> None:
+        """Start recording added calculations, so a table built from the database meanwhile doesn't lose them"""
+        self._journal = []
+
+    def abort_rebuild(self) -> None:
+        self._journal = None
+
+    def replace(self, other: "CategoryLookup") -> None:
+        """
+        Swap in the contents of a freshly built table, with the calculations added since begin_rebuild() replayed on top.
+        Replaying a save the rebuild already read is harmless, the voter's vote just stays where it is.
+        """
+        for assignments, voter in self._journal or []:
+            other.add_calculation(assignments, voter)
+        self._journal = None
+        self._votes = other._votes
+        self._template_votes = other._template_votes
+        self._voters = other._voters
+
+    def lookup(self,
+               name: Optional[str],
+               assignment_type: Optional[str],
+               available_categories: Iterable[str]) -> Optional[Tuple[str, float, List[str]]]:
+        """
+        Return (category, confidence, reasons) if past calculations agree on one of the available categories,
+        the category is returned as spelled in available_categories.
+        The exact name decides once it has LOOKUP_MIN_VOTES votes, its template is consulted for names with fewer.
+        """
+        key = lookup_key(name, assignment_type)
+        available = {category.strip().lower(): category for category in available_categories}
+
+        votes = self._votes.get(key)
+        total = sum(votes.values()) if votes else 0
+        if total >= LOOKUP_MIN_VOTES:
+            for category, count in votes.most_common():
+                if category in available:
+                    share = count / total
+                    if count < LOOKUP_MIN_VOTES or share < LOOKUP_MIN_SHARE:
+                        return None
+                    return available[category], round(share * LOOKUP_MAX_CONFIDENCE, 3), [f"history:{count}_of_{total}_saved"]
+            return None
+
+        if series_key(name, assignment_type) == key:
+            return None
+        return self.template_lookup(name, assignment_type, available.values())
+
+    def template_lookup(self,
+                        name: Optional[str],
+                        assignment_type: Optional[str],
+                        available_categories: Iterable[str]) -> Optional[Tuple[str, float, List[str]]]:
+        """
+        Answer of the template votes alone, the answer for every member of the series.
+        What the OpenAI cache may be seeded with, since it keys entries on the template.
+        """
+        available = {category.strip().lower(): category for category in available_categories}
+        votes = self._template_votes.get(series_key(name, assignment_type))
+        if not votes:
+            return None
+        total = sum(votes.values())
+        for category, count in votes.most_common():
+            if category in available:
+                share = count / (total + TEMPLATE_VOTE_PRIOR)
+                if share < LOOKUP_MIN_SHARE:
+                    return None
+                return available[category], round(share * LOOKUP_MAX_CONFIDENCE, 3), [f"template_history:{count}_of_{total}_saved"]
+        return None
+
+    def save_snapshot(self, path: str = CATEGORY_LOOKUP_SNAPSHOT_PATH) -> None:
+        """Write the table as JSON, replacing the previous snapshot atomically"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "names": _encode_votes(self._votes),
+                "templates": _encode_votes(self._template_votes),
+                "voters": [[*voter_key, category] for voter_key, category in self._voters.items()] if PERSIST_VOTERS else []
+            }, f)
+        os.replace(temp_path, path)
+
+    def load_snapshot(self, path: str = CATEGORY_LOOKUP_SNAPSHOT_PATH) -> bool:
+        """Replace the table with a saved snapshot, returns whether one was loaded"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") != SNAPSHOT_VERSION:
+                print(f"Ignoring category lookup snapshot with version {data.get('version')}")
+                return False
+            self._votes = _decode_votes(data.get("names", {}))
+            self._template_votes = _decode_votes(data.get("templates", {}))
+            self._voters = {tuple(entry[:4]): entry[4] for entry in data.get("voters", [])}
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Error loading category lookup snapshot: {e}")
+            return False
+        print(f"Loaded category lookup snapshot with {len(self._votes)} names and {len(self._template_votes)} templates")
+        return True
+
+    def __len__(self) -> int:
+        return len(self._votes)
+
+    def get_stats(self) -> dict:
+        """Return lookup table statistics"""
+        return {
+            "names": len(self._votes),
+            "votes": sum(sum(votes.values()) for votes in self._votes.values()),
+            "templates": len(self._template_votes)
+        }
@@ -1,10 +1,21 @@
 """
 Attempts to categorize assignments based on regex patterns.
+The rule set is defined and compiled once at import, every CategoryMatcher is just a view over it.
 """
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Set
+from bisect import bisect_right
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+import os
 import re
 
+from ..utils.lru_cache import LRUCache
+
+# Bump whenever the patterns or scoring below change, or the way the parser categorizes what they don't settle,
+# cached categorization results are keyed on it
+RULES_VERSION = "2"
+
 @dataclass
 class CategoryMatch:
     """Represents a potential category match for an assignment"""
@@ -12,336 +23,576 @@ class CategoryMatch:
     confidence: float  # 0-1 confidence score
     match_reasons: List[str]
 
-@dataclass
+@dataclass(frozen=True)
 class CategoryPattern:
     """Defines patterns for a category"""
-    prefixes: List[str]
-    keywords: List[str]
-    assignment_types: List[str]
-    compound_patterns: Optional[List[str]] = None
-    negative_patterns: Optional[List[str]] = None
+    prefixes: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+    assignment_types: Tuple[str, ...]
+    compound_patterns: Optional[Tuple[str, ...]] = None
+    negative_patterns: Optional[Tuple[str, ...]] = None
     minimum_confidence: float = 0.3  # Minimum confidence threshold for this category
     is_compound_category: bool = False  # Whether this is a compound category (e.g., "Lab/Lecture")
-    compound_components: Optional[List[str]] = None  # For compound categories, list of component words
+    compound_components: Optional[Tuple[str, ...]] = None  # For compound categories, list of component words
+
+    def __post_init__(self):
+        # Freeze list arguments so the shared rule set can't be mutated by a request
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if isinstance(value, list):
+                object.__setattr__(self, f.name, tuple(value))
+
+@dataclass(frozen=True)
+class CompiledCategoryPattern:
+    """
+    A CategoryPattern resolved against the shared feature scanner, ready to be shared across requests.
+    Every check is stored as (source, feature bit) so scoring only reads the bitset of a scanned name.
+    """
+    category: str
+    pattern: CategoryPattern
+    compound_features: Tuple[Tuple[str, int], ...] = ()
+    negative_features: Tuple[Tuple[str, int], ...] = ()
+    prefix_features: Tuple[Tuple[str, int], ...] = ()
+    keyword_features: Tuple[Tuple[str, int], ...] = ()
+    component_features: Tuple[Tuple[str, int], ...] = ()
+    # Union of the bits of each group, lets scoring skip groups with no hit at all
+    compound_mask: int = 0
+    negative_mask: int = 0
+    prefix_mask: int = 0
+    keyword_mask: int = 0
+    component_mask: int = 0
+
+@dataclass(frozen=True)
+class NameFeatures:
+    """Everything the scoring step needs about one assignment name, computed in a single scan"""
+    normalized_text: str
+    hits: int  # bitset of matched features
+    context_score: float
+
+    def has(self, feature: int) -> bool:
+        return bool(self.hits >> feature & 1)
+
+# Top 10 most common categories
+CATEGORY_PATTERNS: Mapping[str, CategoryPattern] = MappingProxyType({
+    "Lab Quizzes": CategoryPattern(
+        prefixes=["lab", "laboratory"],
+        keywords=["quiz", "test", "assessment", "lab", "laboratory"],
+        assignment_types=["Quiz", "Lab Quiz", "Assessment"],
+        compound_patterns=[
+            r'(?i)lab(?:oratory)?[\s/+-]*quiz(?:zes)?',
+            r'(?i)quiz(?:zes)?[\s/+-]*lab(?:oratory)?',
+            r'(?i)lab\s*\d+\s*quiz',
+            r'(?i)quiz\s*\d+\s*lab'
+        ],
+        negative_patterns=[
+            r'(?i)pre[\s-]*lab',
+            r'(?i)post[\s-]*lab',
+            r'(?i)lecture'
+        ],
+        is_compound_category=True,
+        compound_components=["lab", "quiz"]
+    ),
+    
+    "Labs": CategoryPattern(
+        prefixes=["lab", "laboratory", "practical", "experiment"],
+        keywords=["lab", "laboratory", "experiment", "practical", "procedure"],
+        assignment_types=["Lab", "Laboratory", "Experiment", "Practical"],
+        compound_patterns=[
+            r'(?i)lab\s*\d+',
+            r'(?i)laboratory\s*\d+',
+            r'(?i)experiment\s*\d+',
+            r'(?i)^lab\s+[0-9]+$',
+            r'(?i)[\s_-]lab[\s_-]report',
+            r'(?i)practical\s*\d+'
+        ],
+        negative_patterns=[
+            r'(?i)lab[\s_-]*quiz',
+            r'(?i)pre[\s_-]*lab',
+            r'(?i)post[\s_-]*lab'
+        ]
+    ),
+    
+    "Exams": CategoryPattern(
+        prefixes=["final", "exam"],
+        keywords=["final", "exam", "final exam"],
+        assignment_types=["Final Exam", "Exam", "Final"],
+        compound_patterns=[
+            r'(?i)final\s*exam',
+            r'(?i)exam\s*final',
+            r'(?i)^final$'
+        ],
+        negative_patterns=[
+            r'(?i)midterm',
+            r'(?i)practice',
+            r'(?i)sample'
+        ],
+        minimum_confidence=0.4
+    ),
+    
+    "Presentations": CategoryPattern(
+        prefixes=["presentation", "pres", "talk", "speech"],
+        keywords=["presentation", "oral", "speech", "talk", "demo", "demonstration"],
+        assignment_types=["Presentation", "Speech", "Oral", "Talk"],
+        compound_patterns=[
+            r'(?i)presentation\s*\d*',
+            r'(?i)oral\s*presentation',
+            r'(?i)group\s*presentation',
+            r'(?i)[\s_-]presentation',
+            r'(?i)speech\s*\d+'
+        ]
+    ),
+    
+    "Discussion/Recitation": CategoryPattern(
+        prefixes=["discussion", "recitation", "disc", "section"],
+        keywords=["discussion", "recitation", "section", "seminar", "forum"],
+        assignment_types=["Discussion", "Recitation", "Section"],
+        compound_patterns=[
+            r'(?i)discussion\s*\d+',
+            r'(?i)disc\s*\d+',
+            r'(?i)recitation\s*\d+',
+            r'(?i)section\s*\d+',
+            r'(?i)[\s_-]discussion',
+            r'(?i)discussion[\s_-]board',
+            r'(?i)discussion[\s_-]post'
+        ],
+        is_compound_category=True,
+        compound_components=["discussion", "recitation"]
+    ),
+    
+    "Final Project/Capstone": CategoryPattern(
+        prefixes=["final", "capstone", "culminating"],
+        keywords=["final", "project", "capstone", "culminating", "thesis"],
+        assignment_types=["Final Project", "Capstone", "Project"],
+        compound_patterns=[
+            r'(?i)final\s*project',
+            r'(?i)capstone\s*project',
+            r'(?i)culminating\s*project',
+            r'(?i)senior\s*project',
+            r'(?i)thesis\s*project'
+        ],
+        negative_patterns=[
+            r'(?i)midterm',
+            r'(?i)practice',
+            r'(?i)sample'
+        ],
+        is_compound_category=True,
+        compound_components=["final", "project"]
+    ),
+    
+    "Group Work/Collaborative Assignments": CategoryPattern(
+        prefixes=["group", "team", "collaborative", "peer"],
+        keywords=["group", "team", "collaborative", "peer", "cooperation"],
+        assignment_types=["Group", "Team", "Collaborative"],
+        compound_patterns=[
+            r'(?i)group\s*(?:assignment|project|work)',
+            r'(?i)team\s*(?:assignment|project|work)',
+            r'(?i)collaborative\s*(?:assignment|project|work)',
+            r'(?i)peer\s*(?:assignment|project|work)'
+        ],
+        is_compound_category=True,
+        compound_components=["group", "collaborative"]
+    ),
+    
+    "Lecture/Lab Participation": CategoryPattern(
+        prefixes=["lecture", "lab", "class"],
+        keywords=[
+            "participation",
+            "attendance",
+            "engagement",
+            "lecture",
+            "laboratory",
+            "lab"
+        ],
+        assignment_types=["Participation", "Attendance"],
+        compound_patterns=[
+            r'(?i)(?:lecture|lab|class)[\s/+-]*participation',
+            r'(?i)participation[\s/+-]*(?:lecture|lab|class)',
+            r'(?i)lecture[\s/+-]*lab[\s/+-]*participation',
+            r'(?i)lab[\s/+-]*lecture[\s/+-]*participation'
+        ],
+        is_compound_category=True,
+        compound_components=["lecture", "lab", "participation"]
+    ),
+    
+    "Homework": CategoryPattern(
+        prefixes=["hw", "homework", "h", "assignment", "asgmt"],
+        keywords=["homework", "assignment", "milestone", "required", "work"],
+        assignment_types=["Assignment", "Homework"],
+        compound_patterns=[
+            r'(?i)homework\s*\d+',
+            r'(?i)hw\s*\d+',
+            r'(?i)^hw\d+',
+            r'(?i)hw[0-9.]+[._](?:required|milestone|m\d+)',
+            r'(?i)^h[0-9.]+',
+            r'(?i)homework[0-9]+',
+            r'(?i)^homework\s+[0-9]+$'
+        ],
+        negative_patterns=[
+            r'(?i)lab',
+            r'(?i)project',
+            r'(?i)exam',
+            r'(?i)final',
+            r'(?i)quiz',
+            r'(?i)test',
+            r'(?i)extra',
+            r'(?i)bonus'
+        ]
+    ),
+    
+    "Quizzes": CategoryPattern(
+        prefixes=["quiz", "qz", "q"],
+        keywords=["quiz", "quizzes", "assessment"],
+        assignment_types=["Quiz", "Assessment"],
+        compound_patterns=[
+            r'(?i)quiz\s*\d+',
+            r'(?i)quiz\d+',
+            r'(?i)^q\d+',
+            r'(?i)^quiz\s+[0-9]+$',
+            r'(?i)^q[0-9]+$'
+        ],
+        negative_patterns=[
+            r'(?i)lab\s*quiz',
+            r'(?i)quiz\s*retake',
+            r'(?i)practice[\s-]*quiz',
+            r'(?i)sample[\s-]*quiz',
+            r'(?i)final'
+        ]
+    ),
+    
+    "Tests": CategoryPattern(
+        prefixes=["test", "t", "midterm"],
+        keywords=["test", "exam", "midterm"],
+        assignment_types=["Test", "Exam"],
+        compound_patterns=[
+            r'(?i)test\s*\d+',
+            r'(?i)^t\d+',
+            r'(?i)midterm\s*\d*',
+            r'(?i)exam\s*\d+'
+        ],
+        negative_patterns=[
+            r'(?i)final',
+            r'(?i)quiz',
+            r'(?i)practice',
+            r'(?i)sample'
+        ],
+        minimum_confidence=0.4
+    ),
+    
+    "Participation": CategoryPattern(
+        prefixes=["participation", "attend", "engage", "inclass", "in-class"],
+        keywords=[
+            "participation",
+            "attendance",
+            "engagement",
+            "class participation",
+            "ed_participation",
+            "guest lecture",
+            "lecture",
+            "exercise",
+            "in-class",
+            "inclass"
+        ],
+        assignment_types=["Participation", "Attendance", "Exercise"],
+        compound_patterns=[
+            r'(?i)class\s*participation',
+            r'(?i)lecture[_-]participation',
+            r'(?i)guest[_-]lecture',
+            r'(?i)in-?class[_-]exercise[_-]?\d*',
+            r'(?i)inclass[_-]exercise[_-]?\d*',
+            r'(?i)attendance\s*\d+'
+        ]
+    ),
+
+    "Project": CategoryPattern(
+        prefixes=["project", "p", "proj"],
+        keywords=["project", "p", "proj"],
+        assignment_types=["Project"],
+        compound_patterns=[
+            r'(?i)project\s*\d+',
+            r'(?i)proj\s*\d+',
+            r'(?i)p\s*\d+',
+            r'(?i)^p\d+',
+            r'(?i)project[0-9]+',
+            r'(?i)^project\s+[0-9]+$'
+        ],
+        negative_patterns=[
+            r'(?i)lab',
+            r'(?i)quiz',
+            r'(?i)test',
+            r'(?i)final',
+            r'(?i)extra',
+            r'(?i)bonus'
+        ]
+    ),
+
+    "Papers": CategoryPattern(
+        prefixes=["paper", "p", "paper"],
+        keywords=["paper", "p", "paper"],
+        assignment_types=["Paper"],
+        compound_patterns=[
+            r'(?i)paper\s*\d+',
+            r'(?i)p\s*\d+',
+            r'(?i)^p\d+',
+            r'(?i)paper[0-9]+',
+            r'(?i)^paper\s+[0-9]+$'
+        ],
+        negative_patterns=[
+            r'(?i)lab',
+            r'(?i)quiz',
+            r'(?i)test',
+            r'(?i)final',
+        ]
+    )
+})
+
+# Patterns that should always be left uncategorized
+SKIP_PATTERNS: Tuple[Tuple[str, str], ...] = (
+    (r'(?i)extra\s*credit', "extra credit assignment"),
+    (r'(?i)bonus', "bonus assignment"),
+    (r'(?i)retake', "retake/makeup assignment"),
+    (r'(?i)make[-\s]*up', "retake/makeup assignment"),
+    (r'(?i)_ec(\s|$|_)', "extra credit assignment"),
+    (r'(?i)[\s_-]bonus(\s|$)', "bonus assignment"),
+    (r'(?i)[\s_-]extra(\s|$)', "extra credit assignment"),
+    (r'(?i)_required$', "extra credit companion assignment"),
+    (r'(?i)_make_?up(\s|$)', "makeup assignment"),
+    (r'(?i)redo', "redo assignment"),
+    (r'(?i)resubmission', "resubmitted assignment"),
+    (r'(?i)_optional(\s|$)', "optional assignment"),
+)
+
+# Words marking a duplicate or variant of another assignment
+VARIANT_WORDS = frozenset(['regrade', 'revised', 'update', 'correction'])
+
+# Context words dictionary
+CONTEXT_WORDS: Mapping[str, float] = MappingProxyType({
+    'group': 0.2,
+    'team': 0.2,
+    'individual': -0.1,
+    'optional': -0.2,
+    'practice': -0.3,
+    'sample': -0.3
+})
+
+# Regular expressions for patterns
+COMPOUND_SEPARATOR_PATTERN = re.compile(r'[/&+-]|\s+and\s+|\s+or\s+')
+NUMBER_PATTERN = re.compile(r'[0-9]+')
+SEPARATOR_PATTERN = re.compile(r'[-_\s]+')
+DATE_PATTERN = re.compile(r'\b\d{1,2}/\d{1,2}\b')
+WEEK_PATTERN = re.compile(r'(?i)week\s*\d+')
+
+class _FeatureScanner:
+    """
+    Collects every distinct check used by the rules (regexes, keywords, prefixes, context and variant words)
+    and gives each one a bit. Checks shared by several categories are evaluated only once per name.
+    Literal checks run as substring tests on the name padded with spaces, so word prefixes and whole words
+    are plain substring tests too (normalized names only contain single spaces).
+    """
+
+    def __init__(self):
+        self._features: Dict[Tuple[str, str], int] = {}
+
+    def regex(self, source: str) -> int:
+        """A rule regex, searched in the normalized name"""
+        return self._add('regex', source)
+
+    def substring(self, text: str) -> int:
+        """Plain substring test (`text in normalized_text`)"""
+        return self._add('literal', text)
+
+    def word_prefix(self, prefix: str) -> int:
+        """Some whitespace separated word starts with prefix"""
+        return self._add('literal', ' ' + prefix)
+
+    def word(self, word: str) -> int:
+        """Some whitespace separated word equals word"""
+        return self._add('literal', ' ' + word + ' ')
+
+    def _add(self, kind: str, value: str) -> int:
+        return self._features.setdefault((kind, value), len(self._features))
+
+    def compile(self) -> Tuple[Tuple[Tuple[str, int], ...], Tuple[Tuple[re.Pattern, int], ...]]:
+        """Returns the (literal, bit) and (compiled regex, bit) checks"""
+        literals = tuple((value, bit) for (kind, value), bit in self._features.items() if kind == 'literal')
+        regexes = tuple((re.compile(value), bit) for (kind, value), bit in self._features.items() if kind == 'regex')
+        return literals, regexes
+
+_scanner = _FeatureScanner()
+
+SKIP_FEATURES: Tuple[Tuple[int, str], ...] = tuple(
+    (_scanner.regex(pattern), reason) for pattern, reason in SKIP_PATTERNS
+)
+VARIANT_FEATURES: Tuple[int, ...] = tuple(_scanner.word(word) for word in sorted(VARIANT_WORDS))
+CONTEXT_FEATURES: Tuple[Tuple[int, float], ...] = tuple(
+    (_scanner.substring(word), adjustment) for word, adjustment in CONTEXT_WORDS.items()
+)
+
+def _feature_mask(features: Tuple[Tuple[str, int], ...]) -> int:
+    mask = 0
+    for _, bit in features:
+        mask |= 1 << bit
+    return mask
+
+def _compile_rule(category: str, pattern: CategoryPattern) -> CompiledCategoryPattern:
+    compound_features = tuple((p, _scanner.regex(p)) for p in pattern.compound_patterns or ())
+    negative_features = tuple((p, _scanner.regex(p)) for p in pattern.negative_patterns or ())
+    prefix_features = tuple((prefix, _scanner.word_prefix(prefix)) for prefix in pattern.prefixes)
+    keyword_features = tuple((keyword, _scanner.substring(keyword)) for keyword in pattern.keywords)
+    # Components never contain separator characters, so a hit in the whole text is a hit in one of its parts
+    component_features = ()
+    if pattern.is_compound_category and pattern.compound_components:
+        component_features = tuple((component, _scanner.substring(component)) for component in pattern.compound_components)
+
+    return CompiledCategoryPattern(
+        category=category,
+        pattern=pattern,
+        compound_features=compound_features,
+        negative_features=negative_features,
+        prefix_features=prefix_features,
+        keyword_features=keyword_features,
+        component_features=component_features,
+        compound_mask=_feature_mask(compound_features),
+        negative_mask=_feature_mask(negative_features),
+        prefix_mask=_feature_mask(prefix_features),
+        keyword_mask=_feature_mask(keyword_features),
+        component_mask=_feature_mask(component_features)
+    )
+
+COMPILED_CATEGORY_PATTERNS: Tuple[CompiledCategoryPattern, ...] = tuple(
+    _compile_rule(category, pattern) for category, pattern in CATEGORY_PATTERNS.items()
+)
+
+LITERAL_FEATURES, REGEX_FEATURES = _scanner.compile()
+
+def category_set_fingerprint(available_categories: Optional[List[str]]) -> Optional[FrozenSet[str]]:
+    """Case-insensitive identity of a category set, None means every category is allowed"""
+    return frozenset(cat.lower() for cat in available_categories) if available_categories else None
+
+@lru_cache(maxsize=1024)
+def _rules_for_fingerprint(fingerprint: Optional[FrozenSet[str]]) -> Tuple[CompiledCategoryPattern, ...]:
+    """Filtered view of the compiled rule set, computed once per distinct category set"""
+    return tuple(
+        rule for rule in COMPILED_CATEGORY_PATTERNS
+        if fingerprint is None or rule.category.lower() in fingerprint
+    )
+
+# Memoized match results, shared by every matcher in the process
+MATCH_CACHE_SIZE = int(os.getenv("CATEGORY_MATCH_CACHE_SIZE", "10000"))
+_match_cache = LRUCache(maxsize=MATCH_CACHE_SIZE)
+
+def get_match_cache_stats() -> dict:
+    """Return hit/miss statistics of the rule-based match cache"""
+    return _match_cache.get_stats()
+
+def clear_match_cache() -> None:
+    _match_cache.clear()
 
 class CategoryMatcher:
+    # The shared rule set, kept as class attributes for callers that inspect a matcher
+    category_patterns = CATEGORY_PATTERNS
+    context_words = CONTEXT_WORDS
+    compound_separator_pattern = COMPOUND_SEPARATOR_PATTERN
+    number_pattern = NUMBER_PATTERN
+    separator_pattern = SEPARATOR_PATTERN
+    date_pattern = DATE_PATTERN
+    week_pattern = WEEK_PATTERN
+
     def __init__(self, available_categories: Optional[List[str]] = None):
-        self.available_categories = {cat.lower() for cat in available_categories} if available_categories else None
-        
-        # Add compound category recognition
-        self.compound_separator_pattern = re.compile(r'[/&+-]|\s+and\s+|\s+or\s+')
-        
-        # Top 10 most common categories
-        self.category_patterns: Dict[str, CategoryPattern] = {
-            "Lab Quizzes": CategoryPattern(
-                prefixes=["lab", "laboratory"],
-                keywords=["quiz", "test", "assessment", "lab", "laboratory"],
-                assignment_types=["Quiz", "Lab Quiz", "Assessment"],
-                compound_patterns=[
-                    r'(?i)lab(?:oratory)?[\s/+-]*quiz(?:zes)?',
-                    r'(?i)quiz(?:zes)?[\s/+-]*lab(?:oratory)?',
-                    r'(?i)lab\s*\d+\s*quiz',
-                    r'(?i)quiz\s*\d+\s*lab'
-                ],
-                negative_patterns=[
-                    r'(?i)pre[\s-]*lab',
-                    r'(?i)post[\s-]*lab',
-                    r'(?i)lecture'
-                ],
-                is_compound_category=True,
-                compound_components=["lab", "quiz"]
-            ),
-            
-            "Labs": CategoryPattern(
-                prefixes=["lab", "laboratory", "practical", "experiment"],
-                keywords=["lab", "laboratory", "experiment", "practical", "procedure"],
-                assignment_types=["Lab", "Laboratory", "Experiment", "Practical"],
-                compound_patterns=[
-                    r'(?i)lab\s*\d+',
-                    r'(?i)laboratory\s*\d+',
-                    r'(?i)experiment\s*\d+',
-                    r'(?i)^lab\s+[0-9]+$',
-                    r'(?i)[\s_-]lab[\s_-]report',
-                    r'(?i)practical\s*\d+'
-                ],
-                negative_patterns=[
-                    r'(?i)lab[\s_-]*quiz',
-                    r'(?i)pre[\s_-]*lab',
-                    r'(?i)post[\s_-]*lab'
-                ]
-            ),
-            
-            "Exams": CategoryPattern(
-                prefixes=["final", "exam"],
-                keywords=["final", "exam", "final exam"],
-                assignment_types=["Final Exam", "Exam", "Final"],
-                compound_patterns=[
-                    r'(?i)final\s*exam',
-                    r'(?i)exam\s*final',
-                    r'(?i)^final$'
-                ],
-                negative_patterns=[
-                    r'(?i)midterm',
-                    r'(?i)practice',
-                    r'(?i)sample'
-                ],
-                minimum_confidence=0.4
-            ),
-            
-            "Presentations": CategoryPattern(
-                prefixes=["presentation", "pres", "talk", "speech"],
-                keywords=["presentation", "oral", "speech", "talk", "demo", "demonstration"],
-                assignment_types=["Presentation", "Speech", "Oral", "Talk"],
-                compound_patterns=[
-                    r'(?i)presentation\s*\d*',
-                    r'(?i)oral\s*presentation',
-                    r'(?i)group\s*presentation',
-                    r'(?i)[\s_-]presentation',
-                    r'(?i)speech\s*\d+'
-                ]
-            ),
-            
-            "Discussion/Recitation": CategoryPattern(
-                prefixes=["discussion", "recitation", "disc", "section"],
-                keywords=["discussion", "recitation", "section", "seminar", "forum"],
-                assignment_types=["Discussion", "Recitation", "Section"],
-                compound_patterns=[
-                    r'(?i)discussion\s*\d+',
-                    r'(?i)disc\s*\d+',
-                    r'(?i)recitation\s*\d+',
-                    r'(?i)section\s*\d+',
-                    r'(?i)[\s_-]discussion',
-                    r'(?i)discussion[\s_-]board',
-                    r'(?i)discussion[\s_-]post'
-                ],
-                is_compound_category=True,
-                compound_components=["discussion", "recitation"]
-            ),
-            
-            "Final Project/Capstone": CategoryPattern(
-                prefixes=["final", "capstone", "culminating"],
-                keywords=["final", "project", "capstone", "culminating", "thesis"],
-                assignment_types=["Final Project", "Capstone", "Project"],
-                compound_patterns=[
-                    r'(?i)final\s*project',
-                    r'(?i)capstone\s*project',
-                    r'(?i)culminating\s*project',
-                    r'(?i)senior\s*project',
-                    r'(?i)thesis\s*project'
-                ],
-                negative_patterns=[
-                    r'(?i)midterm',
-                    r'(?i)practice',
-                    r'(?i)sample'
-                ],
-                is_compound_category=True,
-                compound_components=["final", "project"]
-            ),
-            
-            "Group Work/Collaborative Assignments": CategoryPattern(
-                prefixes=["group", "team", "collaborative", "peer"],
-                keywords=["group", "team", "collaborative", "peer", "cooperation"],
-                assignment_types=["Group", "Team", "Collaborative"],
-                compound_patterns=[
-                    r'(?i)group\s*(?:assignment|project|work)',
-                    r'(?i)team\s*(?:assignment|project|work)',
-                    r'(?i)collaborative\s*(?:assignment|project|work)',
-                    r'(?i)peer\s*(?:assignment|project|work)'
-                ],
-                is_compound_category=True,
-                compound_components=["group", "collaborative"]
-            ),
-            
-            "Lecture/Lab Participation": CategoryPattern(
-                prefixes=["lecture", "lab", "class"],
-                keywords=[
-                    "participation",
-                    "attendance",
-                    "engagement",
-                    "lecture",
-                    "laboratory",
-                    "lab"
-                ],
-                assignment_types=["Participation", "Attendance"],
-                compound_patterns=[
-                    r'(?i)(?:lecture|lab|class)[\s/+-]*participation',
-                    r'(?i)participation[\s/+-]*(?:lecture|lab|class)',
-                    r'(?i)lecture[\s/+-]*lab[\s/+-]*participation',
-                    r'(?i)lab[\s/+-]*lecture[\s/+-]*participation'
-                ],
-                is_compound_category=True,
-                compound_components=["lecture", "lab", "participation"]
-            ),
-            
-            "Homework": CategoryPattern(
-                prefixes=["hw", "homework", "h", "assignment", "asgmt"],
-                keywords=["homework", "assignment", "milestone", "required", "work"],
-                assignment_types=["Assignment", "Homework"],
-                compound_patterns=[
-                    r'(?i)homework\s*\d+',
-                    r'(?i)hw\s*\d+',
-                    r'(?i)^hw\d+',
-                    r'(?i)hw[0-9.]+[._](?:required|milestone|m\d+)',
-                    r'(?i)^h[0-9.]+',
-                    r'(?i)homework[0-9]+',
-                    r'(?i)^homework\s+[0-9]+$'
-                ],
-                negative_patterns=[
-                    r'(?i)lab',
-                    r'(?i)project',
-                    r'(?i)exam',
-                    r'(?i)final',
-                    r'(?i)quiz',
-                    r'(?i)test',
-                    r'(?i)extra',
-                    r'(?i)bonus'
-                ]
-            ),
-            
-            "Quizzes": CategoryPattern(
-                prefixes=["quiz", "qz", "q"],
-                keywords=["quiz", "quizzes", "assessment"],
-                assignment_types=["Quiz", "Assessment"],
-                compound_patterns=[
-                    r'(?i)quiz\s*\d+',
-                    r'(?i)quiz\d+',
-                    r'(?i)^q\d+',
-                    r'(?i)^quiz\s+[0-9]+$',
-                    r'(?i)^q[0-9]+$'
-                ],
-                negative_patterns=[
-                    r'(?i)lab\s*quiz',
-                    r'(?i)quiz\s*retake',
-                    r'(?i)practice[\s-]*quiz',
-                    r'(?i)sample[\s-]*quiz',
-                    r'(?i)final'
-                ]
-            ),
-            
-            "Tests": CategoryPattern(
-                prefixes=["test", "t", "midterm"],
-                keywords=["test", "exam", "midterm"],
-                assignment_types=["Test", "Exam"],
-                compound_patterns=[
-                    r'(?i)test\s*\d+',
-                    r'(?i)^t\d+',
-                    r'(?i)midterm\s*\d*',
-                    r'(?i)exam\s*\d+'
-                ],
-                negative_patterns=[
-                    r'(?i)final',
-                    r'(?i)quiz',
-                    r'(?i)practice',
-                    r'(?i)sample'
-                ],
-                minimum_confidence=0.4
-            ),
-            
-            "Participation": CategoryPattern(
-                prefixes=["participation", "attend", "engage", "inclass", "in-class"],
-                keywords=[
-                    "participation",
-                    "attendance",
-                    "engagement",
-                    "class participation",
-                    "ed_participation",
-                    "guest lecture",
-                    "lecture",
-                    "exercise",
-                    "in-class",
-                    "inclass"
-                ],
-                assignment_types=["Participation", "Attendance", "Exercise"],
-                compound_patterns=[
-                    r'(?i)class\s*participation',
-                    r'(?i)lecture[_-]participation',
-                    r'(?i)guest[_-]lecture',
-                    r'(?i)in-?class[_-]exercise[_-]?\d*',
-                    r'(?i)inclass[_-]exercise[_-]?\d*',
-                    r'(?i)attendance\s*\d+'
-                ]
-            ),
-
-            "Project": CategoryPattern(
-                prefixes=["project", "p", "proj"],
-                keywords=["project", "p", "proj"],
-                assignment_types=["Project"],
-                compound_patterns=[
-                    r'(?i)project\s*\d+',
-                    r'(?i)proj\s*\d+',
-                    r'(?i)p\s*\d+',
-                    r'(?i)^p\d+',
-                    r'(?i)project[0-9]+',
-                    r'(?i)^project\s+[0-9]+$'
-                ],
-                negative_patterns=[
-                    r'(?i)lab',
-                    r'(?i)quiz',
-                    r'(?i)test',
-                    r'(?i)final',
-                    r'(?i)extra',
-                    r'(?i)bonus'
-                ]
-            ),
-
-            "Papers": CategoryPattern(
-                prefixes=["paper", "p", "paper"],
-                keywords=["paper", "p", "paper"],
-                assignment_types=["Paper"],
-                compound_patterns=[
-                    r'(?i)paper\s*\d+',
-                    r'(?i)p\s*\d+',
-                    r'(?i)^p\d+',
-                    r'(?i)paper[0-9]+',
-                    r'(?i)^paper\s+[0-9]+$'
-                ],
-                negative_patterns=[
-                    r'(?i)lab',
-                    r'(?i)quiz',
-                    r'(?i)test',
-                    r'(?i)final',
-                ]
+        self.available_categories = category_set_fingerprint(available_categories)
+        self.rules = _rules_for_fingerprint(self.available_categories)
+
+    def has_temporal_marker(self, text: str) -> bool:
+        """Dates and week numbers are checked on the raw text"""
+        return bool(self.date_pattern.search(text) or self.week_pattern.search(text))
+
+    def extract_features(self,
+                         text: str,
+                         normalized_text: Optional[str] = None,
+                         temporal: Optional[bool] = None) -> NameFeatures:
+        """Normalize a name once and evaluate every distinct rule feature on it once"""
+        if normalized_text is None:
+            normalized_text = self.normalize_text(text)
+        if temporal is None:
+            temporal = self.has_temporal_marker(text)
+        padded_text = f' {normalized_text} '
+        hits = 0
+        for literal, bit in LITERAL_FEATURES:
+            if literal in padded_text:
+                hits |= 1 << bit
+        for regex, bit in REGEX_FEATURES:
+            if regex.search(normalized_text):
+                hits |= 1 << bit
+
+        return NameFeatures(
+            normalized_text=normalized_text,
+            hits=hits,
+            context_score=self._context_score(hits, temporal)
+        )
+
+    def extract_features_batch(self,
+                               normalized_texts: List[str],
+                               temporal_markers: List[bool]) -> List[NameFeatures]:
+        """
+        Evaluate every rule feature across a whole batch of normalized names.
+        Each literal is searched once in the joined batch and its occurrences are mapped back to names,
+        each compiled regex is run over all names before moving to the next one.
+        """
+        padded_texts = [f' {text} ' for text in normalized_texts]
+        hits = [0] * len(padded_texts)
+
+        # Names are joined with newlines, which never occur in a normalized name or in a literal
+        starts = []
+        offset = 0
+        for text in padded_texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        joined = '\n'.join(padded_texts)
+        last_index = len(starts) - 1
+
+        for literal, bit in LITERAL_FEATURES:
+            mask = 1 << bit
+            position = joined.find(literal)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                hits[index] |= mask
+                if index == last_index:
+                    break
+                # One hit per name is enough, continue from the next name
+                position = joined.find(literal, starts[index + 1])
+
+        for regex, bit in REGEX_FEATURES:
+            mask = 1 << bit
+            search = regex.search
+            for index, text in enumerate(normalized_texts):
+                if search(text):
+                    hits[index] |= mask
+
+        return [
+            NameFeatures(
+                normalized_text=text,
+                hits=name_hits,
+                context_score=self._context_score(name_hits, temporal)
             )
-        }
+            for text, name_hits, temporal in zip(normalized_texts, hits, temporal_markers)
+        ]
 
-        # Regular expressions for patterns
-        self.number_pattern = re.compile(r'[0-9]+')
-        self.separator_pattern = re.compile(r'[-_\s]+')
-        self.date_pattern = re.compile(r'\b\d{1,2}/\d{1,2}\b')
-        self.week_pattern = re.compile(r'(?i)week\s*\d+')
-        
-        # Context words dictionary
-        self.context_words = {
-            'group': 0.2,
-            'team': 0.2,
-            'individual': -0.1,
-            'optional': -0.2,
-            'practice': -0.3,
-            'sample': -0.3
-        }
+    def _context_score(self, hits: int, temporal: bool) -> float:
+        """Context adjustments only depend on the name, not on the category being scored"""
+        context_score = 0.0
+        for feature, adjustment in CONTEXT_FEATURES:
+            if hits >> feature & 1:
+                context_score += adjustment
+        if temporal:
+            context_score += 0.1  # Slight boost for assignments with temporal information
+        return context_score
 
     def should_skip_categorization(self, text: str, assignment_type: Optional[str] = None) -> tuple[bool, str]:
         """Check if an assignment should be left uncategorized"""
-        normalized_text = self.normalize_text(text)
-        
-        # Patterns that should always be left uncategorized
-        skip_patterns = [
-            (r'(?i)extra\s*credit', "extra credit assignment"),
-            (r'(?i)bonus', "bonus assignment"),
-            (r'(?i)retake', "retake/makeup assignment"),
-            (r'(?i)make[-\s]*up', "retake/makeup assignment"),
-            (r'(?i)_ec(\s|$|_)', "extra credit assignment"),
-            (r'(?i)[\s_-]bonus(\s|$)', "bonus assignment"),
-            (r'(?i)[\s_-]extra(\s|$)', "extra credit assignment"),
-            (r'(?i)_required$', "extra credit companion assignment"),
-            (r'(?i)_make_?up(\s|$)', "makeup assignment"),
-            (r'(?i)redo', "redo assignment"),
-            (r'(?i)resubmission', "resubmitted assignment"),
-            (r'(?i)_optional(\s|$)', "optional assignment"),
-        ]
-        
-        for pattern, reason in skip_patterns:
-            if re.search(pattern, normalized_text):
+        return self._skip_reason(self.extract_features(text))
+
+    def _skip_reason(self, features: NameFeatures) -> tuple[bool, str]:
+        for feature, reason in SKIP_FEATURES:
+            if features.has(feature):
                 return True, reason
                 
         return False, ""
@@ -354,55 +605,36 @@ class CategoryMatcher:
 
     def get_context_score(self, text: str) -> float:
         """Calculate context-based confidence adjustment"""
-        normalized_text = self.normalize_text(text)
-        score = 0.0
-        
-        # Check for context words
-        for word, adjustment in self.context_words.items():
-            if word in normalized_text:
-                score += adjustment
-        
-        # Check for date/week patterns
-        if self.date_pattern.search(text) or self.week_pattern.search(text):
-            score += 0.1  # Slight boost for assignments with temporal information
-            
-        return score
+        return self.extract_features(text).context_score
 
-    def check_compound_category(self, text: str, pattern: CategoryPattern) -> tuple[float, List[str]]:
+    def check_compound_category(self, features: NameFeatures, rule: CompiledCategoryPattern) -> tuple[float, List[str]]:
         """Special handling for compound categories with separators"""
-        if not pattern.is_compound_category or not pattern.compound_components:
+        hits = features.hits
+        if not hits & rule.component_mask:
             return 0.0, []
-            
-        normalized_text = self.normalize_text(text)
-        parts = self.compound_separator_pattern.split(normalized_text)
-        
-        component_matches = sum(
-            1 for component in pattern.compound_components 
-            if any(component in part for part in parts)
-        )
         
-        if component_matches == 0:
+        matched = [component for component, feature in rule.component_features if hits >> feature & 1]
+        if not matched:
             return 0.0, []
             
-        confidence = (component_matches / len(pattern.compound_components)) * 0.8
-        reasons = [f"compound_component_match:{component}" 
-                  for component in pattern.compound_components 
-                  if any(component in part for part in parts)]
+        confidence = (len(matched) / len(rule.component_features)) * 0.8
+        reasons = [f"compound_component_match:{component}" for component in matched]
                   
         return confidence, reasons
 
     def calculate_pattern_match_confidence(self, 
-                                        text: str, 
-                                        pattern: CategoryPattern, 
+                                        features: NameFeatures, 
+                                        rule: CompiledCategoryPattern, 
                                         assignment_type: Optional[str] = None) -> tuple[float, List[str]]:
-        """Calculate confidence score and reasons for a pattern match"""
-        normalized_text = self.normalize_text(text)
+        """Calculate confidence score and reasons for a pattern match from a scanned name"""
+        pattern = rule.pattern
+        hits = features.hits
         confidence = 0.0
         reasons = []
         
         # If this is a compound category, start with the compound confidence
         if pattern.is_compound_category:
-            compound_confidence, compound_reasons = self.check_compound_category(text, pattern)
+            compound_confidence, compound_reasons = self.check_compound_category(features, rule)
             confidence = compound_confidence
             reasons.extend(compound_reasons)
             
@@ -416,40 +648,39 @@ class CategoryMatcher:
             reasons.append(f"assignment_type_match:{assignment_type}")
         
         # Compound pattern matches (very high confidence)
-        if pattern.compound_patterns:
-            for p in pattern.compound_patterns:
-                if re.search(p, normalized_text):
-                    old_confidence = confidence
+        if hits & rule.compound_mask:
+            for source, feature in rule.compound_features:
+                if hits >> feature & 1:
                     confidence = max(confidence + 0.5, 0.8)
-                    reasons.append(f"compound_pattern_match:{p}")
+                    reasons.append(f"compound_pattern_match:{source}")
                     break
         
         # Prefix matches
-        for prefix in pattern.prefixes:
-            if any(word.startswith(prefix) for word in normalized_text.split()):
-                confidence += 0.3
-                reasons.append(f"prefix_match:{prefix}")
-                break
+        if hits & rule.prefix_mask:
+            for prefix, feature in rule.prefix_features:
+                if hits >> feature & 1:
+                    confidence += 0.3
+                    reasons.append(f"prefix_match:{prefix}")
+                    break
         
         # Keyword matches
         keyword_matches = 0
-        for keyword in pattern.keywords:
-            if keyword in normalized_text:
-                keyword_matches += 1
-                reasons.append(f"keyword_match:{keyword}")
+        if hits & rule.keyword_mask:
+            for keyword, feature in rule.keyword_features:
+                if hits >> feature & 1:
+                    keyword_matches += 1
+                    reasons.append(f"keyword_match:{keyword}")
         confidence += min(keyword_matches * 0.2, 0.4)  # Cap keyword bonus
         
         # Negative pattern penalty
-        if pattern.negative_patterns:
-            for p in pattern.negative_patterns:
-                if re.search(p, normalized_text):
-                    old_confidence = confidence
+        if hits & rule.negative_mask:
+            for source, feature in rule.negative_features:
+                if hits >> feature & 1:
                     confidence = max(0, confidence - 0.4)
-                    reasons.append(f"negative_pattern_match:{p}")
+                    reasons.append(f"negative_pattern_match:{source}")
         
         # Context adjustments
-        context_score = self.get_context_score(text)
-        confidence += context_score
+        confidence += features.context_score
         
         # Normalize final confidence
         confidence = max(0.0, min(1.0, confidence))
@@ -464,9 +695,77 @@ class CategoryMatcher:
     def match_category(self, 
                       assignment_name: str, 
                       assignment_type: Optional[str] = None) -> CategoryMatch:
-        """Match an assignment to a category with advanced confidence scoring"""
+        """Match an assignment to a category with advanced confidence scoring, memoized across requests"""
+        normalized_text = self.normalize_text(assignment_name)
+        temporal = self.has_temporal_marker(assignment_name)
+
+        # The result only depends on the normalized name, the raw-text temporal marker, the type and the category set
+        cache_key = (normalized_text, temporal, assignment_type, self.available_categories)
+        cached = _match_cache.get(cache_key)
+        if cached is None:
+            features = self.extract_features(assignment_name, normalized_text, temporal)
+            cached = self._match_features(features, assignment_type)
+            _match_cache.set(cache_key, cached)
+
+        # Hand out a copy so callers can't alter the cached reasons
+        return CategoryMatch(
+            category=cached.category,
+            confidence=cached.confidence,
+            match_reasons=list(cached.match_reasons)
+        )
+
+    def match_categories(self,
+                         assignment_names: List[str],
+                         assignment_types: Optional[List[Optional[str]]] = None) -> List[CategoryMatch]:
+        """
+        Batch version of match_category, results are returned in input order.
+        Identical names are only scored once, and names missing from the match cache are scanned in one batch pass.
+        """
+        if assignment_types is None:
+            assignment_types = [None] * len(assignment_names)
+        if len(assignment_types) != len(assignment_names):
+            raise ValueError("assignment_names and assignment_types must have the same length")
+
+        keys = []
+        resolved: Dict[tuple, CategoryMatch] = {}
+        missing: Dict[tuple, None] = {}
+        for name, assignment_type in zip(assignment_names, assignment_types):
+            key = (self.normalize_text(name), self.has_temporal_marker(name), assignment_type, self.available_categories)
+            keys.append(key)
+            if key in resolved or key in missing:
+                continue
+            cached = _match_cache.get(key)
+            if cached is None:
+                missing[key] = None
+            else:
+                resolved[key] = cached
+
+        if missing:
+            # Features don't depend on the type, so names are scanned once per distinct (name, temporal) pair
+            texts = list(dict.fromkeys((key[0], key[1]) for key in missing))
+            features = dict(zip(texts, self.extract_features_batch(
+                [text for text, _ in texts],
+                [temporal for _, temporal in texts]
+            )))
+            for key in missing:
+                match = self._match_features(features[(key[0], key[1])], key[2])
+                _match_cache.set(key, match)
+                resolved[key] = match
+
+        return [
+            CategoryMatch(
+                category=resolved[key].category,
+                confidence=resolved[key].confidence,
+                match_reasons=list(resolved[key].match_reasons)
+            )
+            for key in keys
+        ]
+
+    def _match_features(self, features: NameFeatures, assignment_type: Optional[str]) -> CategoryMatch:
+        """Score a scanned name against every available category"""
+
         # First check if we should skip categorization
-        should_skip, skip_reason = self.should_skip_categorization(assignment_name, assignment_type)
+        should_skip, skip_reason = self._skip_reason(features)
         if should_skip:
             return CategoryMatch(
                 category="Uncategorized",
@@ -475,8 +774,7 @@ class CategoryMatcher:
             )
             
         # Also skip if this appears to be a duplicate or variant
-        words = self.normalize_text(assignment_name).split()
-        if any(word in ['regrade', 'revised', 'update', 'correction'] for word in words):
+        if any(features.has(feature) for feature in VARIANT_FEATURES):
             return CategoryMatch(
                 category="Uncategorized",
                 confidence=0.0,
@@ -489,27 +787,20 @@ class CategoryMatcher:
             match_reasons=[]
         )
         
-        # Filter available categories
-        patterns_to_check = {}
-        for category, pattern in self.category_patterns.items():
-            if (self.available_categories is None or 
-                category.lower() in self.available_categories):
-                patterns_to_check[category] = pattern
-        
-        # Calculate confidence for each category
-        for category, pattern in patterns_to_check.items():
+        # Calculate confidence for each available category (already filtered and compiled)
+        for rule in self.rules:
             confidence, reasons = self.calculate_pattern_match_confidence(
-                assignment_name, 
-                pattern, 
+                features, 
+                rule, 
                 assignment_type
             )
             
             # Update best match if confidence is higher
             if confidence > best_match.confidence:
                 best_match = CategoryMatch(
-                    category=category,
+                    category=rule.category,
                     confidence=confidence,
                     match_reasons=reasons
                 )
         
-        return best_match
\ No newline at end of file
+        return best_match
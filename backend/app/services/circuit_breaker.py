@@ -0,0 +1,86 @@
+"""
+Circuit breaker for the OpenAI fallback.
+After repeated failures calls are skipped entirely, so requests go straight to the rule-based results
+instead of waiting on a provider that is down. After a cool-down a single probe call decides whether to close again.
+"""
+import os
+import time
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("OPENAI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CIRCUIT_RESET_TIMEOUT_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures, open -> half-open after the reset timeout, half-open -> closed on a successful probe"""
+
+    def __init__(self,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probe_started_at = None
+        return self._state
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == CLOSED
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now, in half-open state only one probe is let through at a time"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = time.monotonic()
+            # A probe that never reported back (e.g. cancelled) doesn't block the breaker forever
+            if self._probe_started_at is None or now - self._probe_started_at >= self.reset_timeout:
+                self._probe_started_at = now
+                return True
+        self._rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state != CLOSED:
+            print("OpenAI circuit breaker closed, probe call succeeded")
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._probe_started_at = None
+
+    def release(self) -> None:
+        """A call let through was given up before the provider answered (e.g. the caller's deadline), counts as neither"""
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self._times_opened += 1
+                print(f"OpenAI circuit breaker opened after {self._consecutive_failures} consecutive failures")
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+    def get_stats(self) -> dict:
+        """Return circuit breaker statistics"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "times_opened": self._times_opened,
+            "rejected_calls": self._rejected
+        }
@@ -4,105 +4,150 @@ Attempts to use category_matcher first, using rule based regex patterns.
 If that fails, uses OpenAI to categorize.
 """
 
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Tuple
 from ..models.grade_models import Assignment
 from .category_matcher import CategoryMatcher
-from .shared_services import openai_categorizer
+from .shared_services import openai_categorizer, category_lookup, local_classifier
+from .blackboard_tokenizer import BlackboardRow, BlackboardTokenizer, tokenize_blackboard_text
+from .category_lookup import series_key
+from .user_category_index import lookup_user_category
+import asyncio
+import codecs
+import os
 import re
 
-async def parse_blackboard_grades(raw_text: str, available_categories: Optional[List[str]] = None) -> list[Assignment]:
-    assignments = []
-    pending_openai = []  # Store assignments that need OpenAI categorization
-    
-    # Initialize categorizers
-    category_matcher = CategoryMatcher(available_categories=available_categories)
-    
-    # Clean up the text - normalize newlines and remove extra spaces
-    clean_text = '\n'.join(line.strip() for line in raw_text.splitlines() if line.strip())
-    
-    # Create pattern to match assignment blocks
-    # Create pattern to match assignment blocks with all possible variations
-    pattern = re.compile(
-        # Name can contain any characters
-        r'(?P<name>[^\n]+)\n'
-        # Optional due date line
-        r'(?:Due:[^\n]+\n)?'
-        # Optional assignment type - make it optional and capture it if present
-        r'(?:(?P<type>Assignment|Discussion|Test|Blog|Quiz|Exam)\n)?'
-        # Optional date line with flexible format
-        r'(?:[A-Za-z]+ \d{1,2}, \d{4}(?:[^\n]*(?:AM|PM))?\n)?'
-        # Status line
-        r'(?P<status>Graded|Upcoming)\n'
-        # Score line - handle optional spaces and dashes
-        r'(?P<score>\s*-|\s*[0-9.]+)\n'
-        # Total points
-        r'/(?P<total>[0-9.]+)',
-        re.MULTILINE
+STATUS_PREFIX_PATTERN = re.compile(r'^-\\s*(Needs Grading|In Progress|Submitted|Graded)\\s*', re.IGNORECASE)
+
+# Most OpenAI batches of a single paste in flight at once
+OPENAI_MAX_CONCURRENT_BATCHES = int(os.getenv("OPENAI_MAX_CONCURRENT_BATCHES", "4"))
+
+# Members of a series that share one batch slot, the rest start new slots so a long series still fills batches.
+# Only the first member of the series is sent, later slots are answered by the cache or the in-flight request.
+SERIES_SLOT_MAX_MEMBERS = 20
+
+# Longest line accepted by the streaming parser, keeps a paste without newlines from growing the buffer forever
+MAX_STREAM_LINE_LENGTH = 64 * 1024
+
+PendingAssignment = Tuple[Assignment, Tuple[str, Optional[str]]]
+
+def _pack_pending(pending_assignments: List[PendingAssignment],
+                  available_categories: List[str]) -> List[List[int]]:
+    """
+    Split pending assignments into OpenAI requests sized by the shared adaptive batcher, as lists of indexes.
+    The members of a series ("Quiz 1" ... "Quiz 14") go in the same request and take one slot, since only one is sent,
+    up to SERIES_SLOT_MAX_MEMBERS per slot.
+    """
+    series: Dict[Tuple[str, str], List[int]] = {}
+    for index, (_, (name, assignment_type)) in enumerate(pending_assignments):
+        series.setdefault(series_key(name, assignment_type), []).append(index)
+    slots = [
+        indexes[start:start + SERIES_SLOT_MAX_MEMBERS]
+        for indexes in series.values()
+        for start in range(0, len(indexes), SERIES_SLOT_MAX_MEMBERS)
+    ]
+    batches = openai_categorizer.batcher.pack(
+        slots,
+        available_categories,
+        key=lambda indexes: pending_assignments[indexes[0]][1]
     )
-    
-    # First pass: Parse all assignments and attempt rule-based categorization
-    pending_assignments = []
-    for match in pattern.finditer(clean_text):
-        name = match.group('name').strip()
-        
-        # Remove prefixes like '-Needs Grading', '-In Progress' etc.
-        name = re.sub(r'^-\\s*(Needs Grading|In Progress|Submitted|Graded)\\s*', '', name, flags=re.IGNORECASE).strip()
-        
-        # Skip if it's just metadata
-        if name in ['Test', 'Assignment', 'Graded', 'Upcoming']:
-            continue
-            
-        status = 'GRADED' if match.group('status') == 'Graded' else 'UPCOMING' # I'm like 99 % sure that there's only graded/upcoming, should be fine
-        
-        # Handle score
-        score = 0.0
-        if match.group('score') != '-':
-            try:
-                score = float(match.group('score'))
-            except ValueError:
-                print(f"Error parsing score for {name}")
-                continue
-        
-        # Handle total points
+    return [[index for indexes in batch for index in indexes] for batch in batches]
+
+def _build_assignment(row: BlackboardRow) -> Optional[Assignment]:
+    """Turn a tokenized row into an uncategorized Assignment, or None if the row should be skipped"""
+    name = row.name.strip()
+
+    # Remove prefixes like '-Needs Grading', '-In Progress' etc.
+    name = STATUS_PREFIX_PATTERN.sub('', name).strip()
+
+    # Skip if it's just metadata
+    if name in ['Test', 'Assignment', 'Graded', 'Upcoming']:
+        return None
+
+    status = 'GRADED' if row.status == 'Graded' else 'UPCOMING' # I'm like 99 % sure that there's only graded/upcoming, should be fine
+
+    # Handle score
+    score = 0.0
+    if row.score != '-':
         try:
-            total_points = float(match.group('total'))
+            score = float(row.score)
         except ValueError:
-            print(f"Error parsing total points for {name}")
-            continue
-        
-        # Check if it's a test type
-        lines_before_status = clean_text[:match.start('status')].split('\n')
-        assignment_type = None
-        if len(lines_before_status) >= 2 and 'Test' in lines_before_status[-2]:
-            assignment_type = 'Test'
-        
-        # Try rule-based categorization first
-        category_match = category_matcher.match_category(name, assignment_type)
-        
-        # Create assignment object
-        assignment = Assignment(
-            name=name,
-            assignment_type=assignment_type,
-            date_graded=None,
-            status=status,
-            score=score,
-            total_points=total_points,
-            suggested_category=None,
-            category_confidence=0.0,
-            match_reasons=category_match.match_reasons
-        )
-        
+            print(f"Error parsing score for {name}")
+            return None
+
+    # Handle total points
+    try:
+        total_points = float(row.total)
+    except ValueError:
+        print(f"Error parsing total points for {name}")
+        return None
+
+    # Create assignment object, the tokenizer flags blocks whose line before the status mentions 'Test'
+    return Assignment(
+        name=name,
+        assignment_type=row.assignment_type,
+        date_graded=None,
+        status=status,
+        score=score,
+        total_points=total_points,
+        suggested_category=None,
+        category_confidence=0.0,
+        match_reasons=None
+    )
+
+def _categorize_rule_based(rows: List[BlackboardRow],
+                           category_matcher: CategoryMatcher,
+                           available_categories: Optional[List[str]],
+                           user_categories: Optional[Dict[str, str]] = None) -> Tuple[List[Assignment], List[PendingAssignment]]:
+    """
+    Parse rows and categorize them with the rules in one batch.
+    Names the rules aren't sure about are looked up in the user's own past choices, then in everyone's,
+    then given to the local classifier.
+    Returns the assignments settled here and the ones that still need OpenAI, both in input order.
+    """
+    built = [assignment for assignment in map(_build_assignment, rows) if assignment]
+    if not built:
+        return [], []
+
+    # Try rule-based categorization first
+    category_matches = category_matcher.match_categories(
+        [assignment.name for assignment in built],
+        [assignment.assignment_type for assignment in built]
+    )
+
+    assignments = []
+    pending_assignments = []
+    for assignment, category_match in zip(built, category_matches):
         # If rule-based categorization is confident enough (>= 0.5), use it
         if category_match.confidence >= 0.5:
             assignment.suggested_category = category_match.category
             assignment.category_confidence = category_match.confidence
             assignment.match_reasons = category_match.match_reasons
             assignments.append(assignment)
-            print(f"Rule-based categorization successful for: {name}")
-            
+            print(f"Rule-based categorization successful for: {assignment.name}")
+
         # If not confident enough, add to pending for OpenAI
         elif available_categories:
-            pending_assignments.append((assignment, (name, assignment_type)))
+            # Unless the user, or users in general, already filed this name under one of the available categories
+            known = (
+                lookup_user_category(user_categories, assignment.name, assignment.assignment_type, available_categories)
+                or category_lookup.lookup(assignment.name, assignment.assignment_type, available_categories)
+            )
+            if known:
+                assignment.suggested_category, assignment.category_confidence, assignment.match_reasons = known
+                assignments.append(assignment)
+                print(f"Known categorization used for: {assignment.name}")
+                continue
+
+            # The local model answers what it is sure about in-process, OpenAI gets the rest
+            predicted = local_classifier.predict(assignment.name, assignment.assignment_type, available_categories)
+            if predicted:
+                assignment.suggested_category, assignment.category_confidence, assignment.match_reasons = predicted
+                assignments.append(assignment)
+                print(f"Local classifier categorization used for: {assignment.name}")
+                continue
+
+            assignment.match_reasons = category_match.match_reasons
+            pending_assignments.append((assignment, (assignment.name, assignment.assignment_type)))
         else:
             # If no OpenAI fallback available, use rule-based anyway but with low confidence
             assignment.suggested_category = category_match.category
@@ -110,59 +155,215 @@ async def parse_blackboard_grades(raw_text: str, available_categories: Optional[
             assignment.match_reasons = category_match.match_reasons
             assignments.append(assignment)
 
-    # Process pending assignments with OpenAI in batches
-    if pending_assignments:
-        batch_size = 5
-        for i in range(0, len(pending_assignments), batch_size):
-            batch = pending_assignments[i:i + batch_size]
-            batch_inputs = [info for _, info in batch]
-            try:
-                # Use the shared instance for caching benefits
-                results = await openai_categorizer.suggest_categories_batch(
-                    batch_inputs, 
-                    available_categories
-                )
-                
-                # Update assignments with OpenAI results
-                for (assignment, _), (category, confidence, reasons) in zip(batch, results):
-                    # Only use OpenAI's suggestion if it's confident (>= 0.7)
-                    if category and confidence >= 0.7:
-                        assignment.suggested_category = category
-                        assignment.category_confidence = confidence
-                        assignment.match_reasons = ["openai:" + reason for reason in reasons]
-                        print(f"Processed assignment: {assignment.name} (OpenAI confidence: {confidence})")
-                    else:
-                        # If OpenAI isn't confident, revert to rule-based
-                        category_match = category_matcher.match_category(
-                            assignment.name, 
-                            assignment.assignment_type
-                        )
-                        if category_match.confidence > 0:
-                            assignment.suggested_category = category_match.category
-                            assignment.category_confidence = category_match.confidence
-                            assignment.match_reasons = ["openai_fallback:" + reason for reason in category_match.match_reasons]
-                            print(f"OpenAI not confident ({confidence if confidence else 0}), using rule-based: {assignment.name} (confidence: {category_match.confidence})")
-                        else:
-                            # If rule-based also has zero confidence, don't suggest
-                            assignment.suggested_category = None
-                            assignment.category_confidence = 0.0
-                            assignment.match_reasons = ["low_confidence:both_methods_uncertain"]
-                            print(f"Both methods uncertain for: {assignment.name}")
-                    
-                    assignments.append(assignment)
-                    
-            except Exception as e:
-                print(f"OpenAI categorization failed: {str(e)}")
-                # Fall back to rule-based results
-                for assignment, _ in batch:
-                    category_match = category_matcher.match_category(
-                        assignment.name, 
-                        assignment.assignment_type
-                    )
+    return assignments, pending_assignments
+
+async def _categorize_openai_batch(batch: List[PendingAssignment],
+                                   available_categories: List[str],
+                                   category_matcher: CategoryMatcher,
+                                   deadline: Optional[float] = None) -> List[Assignment]:
+    """
+    Categorize a batch of pending assignments with OpenAI, falling back to rule-based results.
+    Only the first member of each series is sent, its result is used for the whole series.
+    """
+    assignments = []
+    batch_series = [series_key(name, assignment_type) for _, (name, assignment_type) in batch]
+    series_inputs = {}
+    for key, (_, info) in zip(batch_series, batch):
+        series_inputs.setdefault(key, info)
+    try:
+        # Use the shared instance for caching benefits
+        series_results = await openai_categorizer.suggest_categories_batch(
+            list(series_inputs.values()),
+            available_categories,
+            deadline=deadline
+        )
+        if len(series_inputs) < len(batch):
+            print(f"Categorized {len(batch)} assignments as {len(series_inputs)} series")
+        results_by_series = dict(zip(series_inputs, series_results))
+        results = [results_by_series[key] for key in batch_series]
+
+        # Rule-based results to fall back on, served from the match cache
+        fallback_matches = category_matcher.match_categories(
+            [assignment.name for assignment, _ in batch],
+            [assignment.assignment_type for assignment, _ in batch]
+        )
+
+        # Update assignments with OpenAI results
+        for (assignment, _), (category, confidence, reasons), category_match in zip(batch, results, fallback_matches):
+            # Only use OpenAI's suggestion if it's confident (>= 0.7)
+            if category and confidence >= 0.7:
+                assignment.suggested_category = category
+                assignment.category_confidence = confidence
+                assignment.match_reasons = ["openai:" + reason for reason in reasons]
+                print(f"Processed assignment: {assignment.name} (OpenAI confidence: {confidence})")
+            else:
+                # If OpenAI isn't confident, revert to rule-based
+                if category_match.confidence > 0:
                     assignment.suggested_category = category_match.category
                     assignment.category_confidence = category_match.confidence
-                    assignment.match_reasons = ["fallback:" + reason for reason in category_match.match_reasons]
-                    assignments.append(assignment)
-                    print(f"Fallback categorization for: {assignment.name}")
+                    assignment.match_reasons = ["openai_fallback:" + reason for reason in category_match.match_reasons]
+                    print(f"OpenAI not confident ({confidence if confidence else 0}), using rule-based: {assignment.name} (confidence: {category_match.confidence})")
+                else:
+                    # If rule-based also has zero confidence, don't suggest
+                    assignment.suggested_category = None
+                    assignment.category_confidence = 0.0
+                    assignment.match_reasons = ["low_confidence:both_methods_uncertain"]
+                    print(f"Both methods uncertain for: {assignment.name}")
+
+            assignments.append(assignment)
+
+    except Exception as e:
+        print(f"OpenAI categorization failed: {str(e)}")
+        # Fall back to rule-based results
+        fallback_matches = category_matcher.match_categories(
+            [assignment.name for assignment, _ in batch],
+            [assignment.assignment_type for assignment, _ in batch]
+        )
+        for (assignment, _), category_match in zip(batch, fallback_matches):
+            assignment.suggested_category = category_match.category
+            assignment.category_confidence = category_match.confidence
+            assignment.match_reasons = ["fallback:" + reason for reason in category_match.match_reasons]
+            assignments.append(assignment)
+            print(f"Fallback categorization for: {assignment.name}")
+
+    return assignments
+
+def _schedule_openai_batches(pending_assignments: List[PendingAssignment],
+                             available_categories: List[str],
+                             category_matcher: CategoryMatcher,
+                             deadline: Optional[float]) -> List[Awaitable[List[Tuple[int, Assignment]]]]:
+    """
+    Split pending assignments into OpenAI batches that run at most OPENAI_MAX_CONCURRENT_BATCHES at a time.
+    Each awaitable returns (index in pending_assignments, assignment) for the assignments it categorized in place,
+    each batch falls back to the rules on its own.
+    """
+    semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_BATCHES)
+
+    async def categorize_batch(indexes: List[int]) -> List[Tuple[int, Assignment]]:
+        async with semaphore:
+            batch = [pending_assignments[index] for index in indexes]
+            return list(zip(indexes, await _categorize_openai_batch(batch, available_categories, category_matcher, deadline)))
+
+    return [categorize_batch(indexes) for indexes in _pack_pending(pending_assignments, available_categories)]
+
+async def parse_blackboard_grades(raw_text: str,
+                                  available_categories: Optional[List[str]] = None,
+                                  deadline: Optional[float] = None,
+                                  user_categories: Optional[Dict[str, str]] = None) -> list[Assignment]:
+    """
+    Parse and categorize a complete Blackboard paste.
+    deadline (a time.monotonic() timestamp) bounds the time spent waiting on OpenAI, rule-based results are used past it.
+    user_categories is the user's index of past choices (see user_category_index), consulted before OpenAI.
+    """
+    # Initialize categorizers
+    category_matcher = CategoryMatcher(available_categories=available_categories)
+
+    # First pass: Parse all assignments and categorize them with the rules in one batch
+    assignments, pending_assignments = _categorize_rule_based(
+        list(tokenize_blackboard_text(raw_text)),
+        category_matcher,
+        available_categories,
+        user_categories
+    )
 
-    return assignments
\ No newline at end of file
+    # Process pending assignments with OpenAI in concurrent batches, they are categorized in place
+    await asyncio.gather(*_schedule_openai_batches(pending_assignments, available_categories, category_matcher, deadline))
+    assignments.extend(assignment for assignment, _ in pending_assignments)
+
+    return assignments
+
+async def stream_categorization_updates(raw_text: str,
+                                        available_categories: Optional[List[str]] = None,
+                                        deadline: Optional[float] = None,
+                                        user_categories: Optional[Dict[str, str]] = None) -> AsyncIterator[Tuple[str, list, int]]:
+    """
+    Progressive variant of parse_blackboard_grades.
+    First yields ("assignments", assignments, pending) with every assignment categorized by the rules, in the same
+    order parse_blackboard_grades returns them, pending being how many of them still wait on OpenAI.
+    Then yields ("update", [(index, assignment), ...], pending) for each OpenAI batch as it completes,
+    index being the position in the first list.
+    """
+    category_matcher = CategoryMatcher(available_categories=available_categories)
+    assignments, pending_assignments = _categorize_rule_based(
+        list(tokenize_blackboard_text(raw_text)),
+        category_matcher,
+        available_categories,
+        user_categories
+    )
+
+    # Rule-based categories stand in for the pending assignments until OpenAI answers
+    provisional_matches = category_matcher.match_categories(
+        [assignment.name for assignment, _ in pending_assignments],
+        [assignment.assignment_type for assignment, _ in pending_assignments]
+    )
+    for (assignment, _), category_match in zip(pending_assignments, provisional_matches):
+        assignment.suggested_category = category_match.category
+        assignment.category_confidence = category_match.confidence
+
+    pending_offset = len(assignments)
+    pending = len(pending_assignments)
+    yield "assignments", assignments + [assignment for assignment, _ in pending_assignments], pending
+
+    batches = _schedule_openai_batches(pending_assignments, available_categories, category_matcher, deadline)
+    for completed in asyncio.as_completed(batches):
+        categorized = await completed
+        pending -= len(categorized)
+        yield "update", [(pending_offset + index, assignment) for index, assignment in categorized], pending
+
+async def stream_blackboard_grades(chunks: AsyncIterator[bytes],
+                                   available_categories: Optional[List[str]] = None,
+                                   encoding: str = 'utf-8',
+                                   deadline: Optional[float] = None,
+                                   user_categories: Optional[Dict[str, str]] = None) -> AsyncIterator[Assignment]:
+    """
+    Streaming variant of parse_blackboard_grades.
+    Decodes the body chunk by chunk, feeds complete lines to the tokenizer and yields each assignment as soon as
+    its block (or its OpenAI batch) is complete. Only the current partial line, the tokenizer window and one
+    pending OpenAI batch are held in memory.
+    """
+    category_matcher = CategoryMatcher(available_categories=available_categories)
+    tokenizer = BlackboardTokenizer()
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending_assignments = []
+    partial_line = ''
+
+    async def handle_rows(rows: List[BlackboardRow]):
+        assignments, pending = _categorize_rule_based(rows, category_matcher, available_categories, user_categories)
+        for assignment in assignments:
+            yield assignment
+        for item in pending:
+            pending_assignments.append(item)
+            batches = [
+                [pending_assignments[index] for index in indexes]
+                for indexes in _pack_pending(pending_assignments, available_categories)
+            ]
+            # Send every full batch, the last one keeps collecting until it is full too
+            if len(batches) > 1:
+                pending_assignments[:] = batches.pop()
+                for batch in batches:
+                    for categorized in await _categorize_openai_batch(batch, available_categories, category_matcher, deadline):
+                        yield categorized
+
+    async for chunk in chunks:
+        text = partial_line + decoder.decode(chunk)
+        lines = text.splitlines(keepends=True)
+        # The last piece is still incomplete unless it ends with a line break
+        partial_line = lines.pop() if lines and lines[-1].splitlines()[0] == lines[-1] else ''
+        if len(partial_line) > MAX_STREAM_LINE_LENGTH:
+            raise ValueError("Input line exceeds the maximum supported length")
+
+        for line in lines:
+            async for assignment in handle_rows(tokenizer.feed(line)):
+                yield assignment
+
+    partial_line += decoder.decode(b'', final=True)
+    for line in partial_line.splitlines():
+        async for assignment in handle_rows(tokenizer.feed(line)):
+            yield assignment
+    async for assignment in handle_rows(tokenizer.finish()):
+        yield assignment
+
+    # Flush the last partial OpenAI batch
+    if pending_assignments:
+        for categorized in await _categorize_openai_batch(pending_assignments, available_categories, category_matcher, deadline):
+            yield categorized
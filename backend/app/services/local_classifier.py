@@ -0,0 +1,223 @@
+"""
+In-process naive Bayes classifier over hashed character n-grams of assignment names.
+Sits between the rule-based matcher and OpenAI: trained offline from saved categorizations, loaded from a
+compact .npz file, and only answers when it is confident, so the remote model only sees what it can't settle.
+Train it with: python -m app.services.local_classifier [--limit N]
+Needs numpy; without it, or without a trained model, every prediction is declined.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import argparse
+import os
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .category_lookup import ConfirmedAssignment, lookup_key
+
+LOCAL_CLASSIFIER_MODEL_PATH = os.getenv(
+    "LOCAL_CLASSIFIER_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cache', 'local_classifier.npz')
+)
+# Confidence the classifier needs before its answer is used instead of asking OpenAI
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.85"))
+# Share of a name's n-grams that must have been seen in training, naive Bayes is overconfident about unfamiliar names
+LOCAL_CLASSIFIER_MIN_COVERAGE = float(os.getenv("LOCAL_CLASSIFIER_MIN_COVERAGE", "0.8"))
+
+# Hashed feature space, the model holds one float32 per (category, feature)
+FEATURE_BUCKETS = 2 ** 14
+NGRAM_SIZES = (2, 3, 4)
+# Only the most common categories get a class, rare spellings don't have the data to learn from
+MAX_CLASSES = 128
+# Minimum saved assignments for a category to get a class
+MIN_CLASS_EXAMPLES = 20
+# Laplace smoothing of the n-gram counts
+SMOOTHING = 1.0
+
+def name_features(name: Optional[str], assignment_type: Optional[str]) -> Dict[int, int]:
+    """Hashed character n-gram counts of the normalized name, plus one feature for the assignment type"""
+    normalized_name, normalized_type = lookup_key(name, assignment_type)
+    text = f" {normalized_name} "
+    features = Counter(
+        zlib.crc32(text[i:i + size].encode('utf-8')) % FEATURE_BUCKETS
+        for size in NGRAM_SIZES
+        for i in range(len(text) - size + 1)
+    )
+    if normalized_type:
+        features[zlib.crc32(f"type:{normalized_type}".encode('utf-8')) % FEATURE_BUCKETS] += 1
+    return features
+
+class LocalClassifier:
+    """Multinomial naive Bayes over the saved categories, restricted at prediction time to the available ones"""
+
+    def __init__(self):
+        self.classes: List[str] = []
+        self._class_index: Dict[str, int] = {}
+        self._log_priors = None
+        self._log_probs = None
+        self._seen = None
+        self.answered = 0
+        self.declined = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._log_probs is not None
+
+    def _set_model(self, classes: List[str], log_priors, log_probs, seen) -> None:
+        self.classes = list(classes)
+        self._class_index = {category: i for i, category in enumerate(self.classes)}
+        self._log_priors = log_priors
+        self._log_probs = log_probs
+        self._seen = seen
+
+    def train(self, assignments: Iterable[ConfirmedAssignment]) -> int:
+        """Fit the model on (name, type, category) examples, returns how many were used"""
+        if np is None:
+            raise RuntimeError("numpy is required to train the local classifier")
+
+        examples = [(name, assignment_type, category.strip().lower()) for name, assignment_type, category in assignments
+                    if name and category and category.strip()]
+        class_counts = Counter(category for _, _, category in examples)
+        classes = [category for category, count in class_counts.most_common(MAX_CLASSES) if count >= MIN_CLASS_EXAMPLES]
+        class_index = {category: i for i, category in enumerate(classes)}
+
+        counts = np.zeros((len(classes), FEATURE_BUCKETS), dtype=np.float32)
+        used = 0
+        for name, assignment_type, category in examples:
+            row = class_index.get(category)
+            if row is None:
+                continue
+            features = name_features(name, assignment_type)
+            counts[row, list(features.keys())] += list(features.values())
+            used += 1
+
+        priors = np.array([class_counts[category] for category in classes], dtype=np.float32)
+        log_priors = np.log(priors / max(priors.sum(), 1.0))
+        smoothed = counts + SMOOTHING
+        log_probs = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self._set_model(classes, log_priors.astype(np.float32), log_probs.astype(np.float32), counts.sum(axis=0) > 0)
+        return used
+
+    def save(self, path: str = LOCAL_CLASSIFIER_MODEL_PATH) -> None:
+        """Write the model as a compressed .npz, replacing the previous one atomically"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            classes=np.array(self.classes),
+            log_priors=self._log_priors,
+            log_probs=self._log_probs,
+            seen=np.packbits(self._seen),
+            feature_buckets=np.array(FEATURE_BUCKETS)
+        )
+        os.replace(temp_path, path)
+
+    def load(self, path: str = LOCAL_CLASSIFIER_MODEL_PATH) -> bool:
+        """Load a trained model, returns whether one was loaded"""
+        if np is None:
+            print("numpy not installed, local classifier disabled")
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as model:
+                if int(model["feature_buckets"]) != FEATURE_BUCKETS:
+                    print("Ignoring local classifier model trained with a different feature space")
+                    return False
+                self._set_model(
+                    [str(category) for category in model["classes"]],
+                    model["log_priors"],
+                    model["log_probs"],
+                    np.unpackbits(model["seen"])[:FEATURE_BUCKETS].astype(bool)
+                )
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"Error loading local classifier model: {e}")
+            return False
+        print(f"Loaded local classifier with {len(self.classes)} categories")
+        return True
+
+    def predict(self,
+                name: Optional[str],
+                assignment_type: Optional[str],
+                available_categories: List[str]) -> Optional[Tuple[str, float, List[str]]]:
+        """
+        Return (category, confidence, reasons) if the model is confident about one of the available categories.
+        Available categories the model has no class for could still be the answer, so the probability is scaled
+        by the share of available categories it knows.
+        """
+        if not self.is_loaded or not available_categories:
+            return None
+        try:
+            known = {}
+            for category in available_categories:
+                row = self._class_index.get(category.strip().lower())
+                if row is not None:
+                    known.setdefault(row, category)
+            if len(known) < 2:
+                self.declined += 1
+                return None
+
+            features = name_features(name, assignment_type)
+            rows = np.fromiter(known.keys(), dtype=np.intp, count=len(known))
+            columns = np.fromiter(features.keys(), dtype=np.intp, count=len(features))
+            values = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+            if values @ self._seen[columns] < LOCAL_CLASSIFIER_MIN_COVERAGE * values.sum():
+                self.declined += 1
+                return None
+            scores = self._log_priors[rows] + self._log_probs[np.ix_(rows, columns)] @ values
+            probabilities = np.exp(scores - scores.max())
+            probabilities /= probabilities.sum()
+
+            best = int(probabilities.argmax())
+            confidence = float(probabilities[best]) * len(known) / len(set(c.strip().lower() for c in available_categories))
+            if confidence < LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+                self.declined += 1
+                return None
+            self.answered += 1
+            confidence = round(confidence, 3)
+            return known[int(rows[best])], confidence, [f"local_model:{confidence}"]
+        except Exception as e:
+            print(f"Local classifier error: {e}")
+            return None
+
+    def get_stats(self) -> dict:
+        """Return classifier statistics"""
+        total = self.answered + self.declined
+        return {
+            "loaded": self.is_loaded,
+            "classes": len(self.classes),
+            "feature_buckets": FEATURE_BUCKETS,
+            "min_confidence": LOCAL_CLASSIFIER_MIN_CONFIDENCE,
+            "min_coverage": LOCAL_CLASSIFIER_MIN_COVERAGE,
+            "answered": self.answered,
+            "declined": self.declined,
+            "answer_ratio": self.answered / total if total > 0 else 0
+        }
+
+def main():
+    """Train the model from saved calculations, the server loads it on its next start"""
+    parser = argparse.ArgumentParser(description="Train the local categorization model from saved calculations")
+    parser.add_argument("--limit", type=int, default=None, help="most recent saved calculations to read")
+    parser.add_argument("--output", default=LOCAL_CLASSIFIER_MODEL_PATH, help="where to write the model")
+    args = parser.parse_args()
+
+    from ..database.database import SessionLocal
+    from .cache_warmup import CACHE_WARMUP_MAX_CALCULATIONS, collect_confirmed_assignments
+
+    db = SessionLocal()
+    try:
+        calculations = collect_confirmed_assignments(db, args.limit or CACHE_WARMUP_MAX_CALCULATIONS)
+    finally:
+        db.close()
+
+    classifier = LocalClassifier()
+    used = classifier.train(assignment for calculation in calculations for assignment in calculation.assignments)
+    classifier.save(args.output)
+    print(f"Trained local classifier on {used} assignments from {len(calculations)} saved calculations, "
+          f"{len(classifier.classes)} categories, written to {args.output}")
+
+if __name__ == "__main__":
+    main()
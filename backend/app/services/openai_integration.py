@@ -2,53 +2,233 @@
 A fallback to category_matcher.py, if regex patterns are not sufficient, 4o mini will attempt to categorize the assignment
 Also utlizes caching to improve performance for repeated categorization requests
 """
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from typing import List, Optional, Tuple
 import os
 import asyncio
+import httpx
 import re
 import time
-import pickle
+import hashlib
+import json
 from datetime import datetime, timedelta
+from .cache_store import CategorizationCacheStore
+from .adaptive_batcher import AdaptiveBatcher
+from .token_bucket import TokenBucketRateLimiter
+from .circuit_breaker import CircuitBreaker
+from .category_lookup import series_key
+from ..utils.lru_cache import LRUCache
 
 load_dotenv()
 
+# Bump to invalidate every cached categorization, e.g. after changing the prompt
+CATEGORIZATION_CACHE_VERSION = "2"
+CATEGORIZATION_CACHE_PREFIX = f"gradeflow:categorization:{CATEGORIZATION_CACHE_VERSION}"
+
+# Static instructions, kept byte-identical across requests so they stay a cacheable prompt prefix
+CATEGORIZATION_SYSTEM_MESSAGE = """You are a helpful teaching assistant that categorizes academic assignments.
+The user message lists the available categories by number, then the assignments by number.
+Categorize every assignment into exactly one of the available categories.
+
+Respond with a single JSON object and nothing else, in this exact shape:
+{"results": [{"a": 1, "c": 2, "p": 0.95, "r": ["quiz in name", "numbered assessment"]}]}
+
+Where, for each assignment:
+- "a" is the assignment number
+- "c" is the CATEGORY NUMBER from the numbered list, never the category name
+- "p" is your confidence, a decimal between 0 and 1
+- "r" is a short list of brief reasons
+Include exactly one entry per assignment."""
+
+# Shared HTTP connection pool for the OpenAI client
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "50"))
+
+# Prompt injection keywords and suspicious patterns, substituted one after another in this order
+INJECTION_PATTERNS = [
+    # Basic instruction override attempts
+    r'ignore previous instructions',
+    r'ignore all instructions',
+    r'forget your instructions',
+    r'new instructions',
+    r'disregard',
+    r'please ignore',
+        
+    # Role-based attacks
+    r'system prompt',
+    r'user prompt',
+    r'assistant prompt',
+    r'\[system\]',
+    r'\[user\]',
+    r'\[assistant\]',
+    r'<system>',
+    r'<user>',
+    r'<assistant>',
+    r'role: system',
+    r'role: user',
+    r'role: assistant',
+    r'as a(n)? (language|AI|LLM|GPT)',
+    r'you are not assistant',
+    r'you are not an AI',
+        
+    # Markdown and formatting
+    r'---+',  # Markdown separators
+    r'\*\*\*+',
+    r'___+',
+        
+    # Context jailbreaks
+    r'\bDAN\b',
+    r'Do Anything Now',
+    r'delimiters',
+    r'context window',
+    r'token limit',
+    r'continue (the|this) (text|story|conversation)',
+    r'pretend to be',
+    r'let\'s play a game',
+    r'assume you are',
+    r'simulate',
+    r'act as if',
+    r'continue from',
+    r'ignore safety',
+    r'bypass (filter|restriction)',
+        
+    # Tokenization manipulation
+    r'base64',
+    r'base 64',
+    r'unicode',
+    r'token[ize|ization]',
+    r'utf-?8',
+    r'ascii',
+    r'hex',
+    r'encoding',
+    r'special characters',
+        
+    # API manipulation
+    r'temperature',
+    r'max_tokens',
+    r'top_p',
+    r'frequency_penalty',
+    r'presence_penalty',
+    r'stop sequence',
+    r'openai',
+    r'api key',
+    r'model',
+        
+    # Unicode homoglyphs and obfuscation
+    r'ѕyѕtem',
+    r'ѕystem',
+    r'аssistant',
+    r'usеr',
+        
+    # Multi-lingual attempts
+    r'système',
+    r'système',
+    r'instruktionen ignorieren',
+    r'ignorar instrucciones',
+        
+    # Escape sequence awareness
+    r'backslash n',
+    r'\\n',
+    r'carriage return',
+    r'newline',
+        
+    # Specific model references
+    r'gpt',
+    r'llama',
+    r'claude',
+    r'bard',
+    r'gemini'
+]
+INJECTION_REGEXES = [re.compile(pattern, re.IGNORECASE) for pattern in INJECTION_PATTERNS]
+# Single scan telling whether any injection pattern occurs at all, most names need none of the substitutions
+INJECTION_PREFILTER = re.compile('|'.join(f'(?:{pattern})' for pattern in INJECTION_PATTERNS), re.IGNORECASE)
+
+CONTROL_CHARS = re.compile(r'[\x00-\x1F\x7F\u200B-\u200F\u2060-\u2064\uFEFF]')
+CODE_BLOCK = re.compile(r'```[\s\S]*?```')
+INLINE_CODE = re.compile(r'`[^`]*`')
+MARKDOWN_HEADER = re.compile(r'\#{1,6}\s')
+HTML_TAG = re.compile(r'<[^>]*>')
+REPEATED_CHARS = re.compile(r'(.)\1{10,}')
+SUSPICIOUS_CHARS = re.compile(r'[^\w\s.,;:!?()[\]{}\/\'"@#$%^&*+=\-]')
+WHITESPACE = re.compile(r'\s+')
+
+# Visually similar characters mapped to their ASCII equivalents
+HOMOGLYPHS = str.maketrans({
+    'а': 'a', 'е': 'e', 'о': 'o', 'р': 'p', 'с': 'c', 
+    'ѕ': 's', 'і': 'i', 'ј': 'j', 'ӏ': 'l', 'ԁ': 'd',
+    'ɑ': 'a', 'ɡ': 'g', 'ι': 'i', 'ϲ': 'c', 'ｅ': 'e'
+})
+
+# In-memory categorization cache: most entries kept, and how often expired entries are swept in the background
+OPENAI_CACHE_MAX_ENTRIES = int(os.getenv("OPENAI_CACHE_MAX_ENTRIES", "10000"))
+OPENAI_CACHE_EXPIRY_INTERVAL_SECONDS = float(os.getenv("OPENAI_CACHE_EXPIRY_INTERVAL_SECONDS", "60"))
+
+# Distinct category lists whose sanitized form is memoized
+SANITIZED_CATEGORIES_CACHE_SIZE = 256
+
 class OpenAICategorizer:
-    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache_dir: Optional[str] = None, redis_client=None,
+                 rate_limiter: Optional[TokenBucketRateLimiter] = None):
         api_key = api_key or os.getenv('OPENAI_API_KEY')
         if not api_key:
             print("Warning: No OpenAI API key found. Will use rule-based categorization only.")
             self.client = None
         else:
-            self.client = OpenAI(api_key=api_key)
+            # Native async client, requests share one keep-alive pool instead of each holding an executor thread
+            self.client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(
+                    timeout=httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS
+                    )
+                )
+            )
+        
+        # Calls beyond the pool size wait here instead of queueing inside httpx, whose pool bookkeeping
+        # rescans every connection for each queued request and slows to a crawl with hundreds waiting
+        self._request_slots = asyncio.Semaphore(OPENAI_MAX_CONNECTIONS)
         
-        self.last_call_time = datetime.now()
-        self.call_count = 0
-        self.rate_limit = 20  # calls per minute
-        self.batch_size = 10  # process assignments in batches
+        # Token bucket shared with the other workers when it is backed by Redis
+        self.rate_limiter = rate_limiter or TokenBucketRateLimiter()
+        self.batcher = AdaptiveBatcher()  # learns how many assignments to send per request
         self.retry_delay = 5  # seconds to wait between retries
         self.max_retries = 3  # maximum number of retry attempts
+        self.circuit_breaker = CircuitBreaker()  # skips OpenAI entirely while it keeps failing
         
-        # Add memoization cache
-        self._cache = {}
+        # Add memoization cache, LRU bounded with a TTL
         self._cache_ttl = timedelta(hours=24)  # Cache valid for 24 hours
+        self._cache = LRUCache(OPENAI_CACHE_MAX_ENTRIES, ttl=self._cache_ttl.total_seconds())
+        self._expiry_task: Optional[asyncio.Task] = None
         self._cache_hits = 0
         self._cache_misses = 0
         
+        self._sanitized_categories = LRUCache(SANITIZED_CATEGORIES_CACHE_SIZE)
+        
+        # Futures of categorizations currently being requested, keyed like the cache
+        self._inflight = {}
+        self._inflight_tasks = set()
+        self._coalesced = 0
+        
+        # Optional shared backend, lets every worker and restart reuse the same categorizations
+        self.redis_client = redis_client
+        
         # Setup persistent cache
         self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'cache')
-        self.cache_file = os.path.join(self.cache_dir, 'openai_cache.pkl')
+        self.cache_file = os.path.join(self.cache_dir, 'openai_cache.sqlite3')
         
         # Create cache directory if it doesn't exist
         os.makedirs(self.cache_dir, exist_ok=True)
         
+        # Each new result is written to disk in the background as soon as it is cached
+        self._store = CategorizationCacheStore(self.cache_file)
+        
         # Load cache from disk if it exists
         self._load_cache_from_disk()
-        
-        # Schedule periodic cache saving
-        self._last_save_time = datetime.now()
-        self._save_interval = timedelta(minutes=5)  # Save every 5 minutes
 
     def sanitize_input(self, text: Optional[str]) -> str:
         """
@@ -61,140 +241,50 @@ class OpenAICategorizer:
         text = str(text)
             
         # Remove control characters and zero-width characters
-        sanitized = re.sub(r'[\x00-\x1F\x7F\u200B-\u200F\u2060-\u2064\uFEFF]', '', text)
+        sanitized = CONTROL_CHARS.sub('', text)
         
         # Remove common markdown and code formatting
-        sanitized = re.sub(r'```[\s\S]*?```', '[code block removed]', sanitized)
-        sanitized = re.sub(r'`[^`]*`', '[inline code removed]', sanitized)
-        sanitized = re.sub(r'\#{1,6}\s', '', sanitized)  # Markdown headers
+        sanitized = CODE_BLOCK.sub('[code block removed]', sanitized)
+        sanitized = INLINE_CODE.sub('[inline code removed]', sanitized)
+        sanitized = MARKDOWN_HEADER.sub('', sanitized)  # Markdown headers
         
         # Remove HTML tags that might be interpreted
-        sanitized = re.sub(r'<[^>]*>', '[html removed]', sanitized)
+        sanitized = HTML_TAG.sub('[html removed]', sanitized)
         
         # Remove prompt injection keywords and suspicious patterns
-        injection_patterns = [
-            # Basic instruction override attempts
-            r'ignore previous instructions',
-            r'ignore all instructions',
-            r'forget your instructions',
-            r'new instructions',
-            r'disregard',
-            r'please ignore',
-            
-            # Role-based attacks
-            r'system prompt',
-            r'user prompt',
-            r'assistant prompt',
-            r'\[system\]',
-            r'\[user\]',
-            r'\[assistant\]',
-            r'<system>',
-            r'<user>',
-            r'<assistant>',
-            r'role: system',
-            r'role: user',
-            r'role: assistant',
-            r'as a(n)? (language|AI|LLM|GPT)',
-            r'you are not assistant',
-            r'you are not an AI',
-            
-            # Markdown and formatting
-            r'---+',  # Markdown separators
-            r'\*\*\*+',
-            r'___+',
-            
-            # Context jailbreaks
-            r'\bDAN\b',
-            r'Do Anything Now',
-            r'delimiters',
-            r'context window',
-            r'token limit',
-            r'continue (the|this) (text|story|conversation)',
-            r'pretend to be',
-            r'let\'s play a game',
-            r'assume you are',
-            r'simulate',
-            r'act as if',
-            r'continue from',
-            r'ignore safety',
-            r'bypass (filter|restriction)',
-            
-            # Tokenization manipulation
-            r'base64',
-            r'base 64',
-            r'unicode',
-            r'token[ize|ization]',
-            r'utf-?8',
-            r'ascii',
-            r'hex',
-            r'encoding',
-            r'special characters',
-            
-            # API manipulation
-            r'temperature',
-            r'max_tokens',
-            r'top_p',
-            r'frequency_penalty',
-            r'presence_penalty',
-            r'stop sequence',
-            r'openai',
-            r'api key',
-            r'model',
-            
-            # Unicode homoglyphs and obfuscation
-            r'ѕyѕtem',
-            r'ѕystem',
-            r'аssistant',
-            r'usеr',
-            
-            # Multi-lingual attempts
-            r'système',
-            r'système',
-            r'instruktionen ignorieren',
-            r'ignorar instrucciones',
-            
-            # Escape sequence awareness
-            r'backslash n',
-            r'\\n',
-            r'carriage return',
-            r'newline',
-            
-            # Specific model references
-            r'gpt',
-            r'llama',
-            r'claude',
-            r'bard',
-            r'gemini'
-        ]
-        
-        for pattern in injection_patterns:
-            sanitized = re.sub(pattern, '[filtered]', sanitized, flags=re.IGNORECASE)
+        # Substituted in order only when one occurs, so overlapping patterns resolve exactly as before
+        if INJECTION_PREFILTER.search(sanitized):
+            for pattern in INJECTION_REGEXES:
+                sanitized = pattern.sub('[filtered]', sanitized)
         
         # Filter out repetitive characters that might be used for manipulation
-        sanitized = re.sub(r'(.)\1{10,}', r'\1\1\1', sanitized)
+        sanitized = REPEATED_CHARS.sub(r'\1\1\1', sanitized)
         
         # Handle homoglyphs and similar Unicode tricks
-        # Map visually similar characters to their ASCII equivalents
-        homoglyph_map = {
-            'а': 'a', 'е': 'e', 'о': 'o', 'р': 'p', 'с': 'c', 
-            'ѕ': 's', 'і': 'i', 'ј': 'j', 'ӏ': 'l', 'ԁ': 'd',
-            'ɑ': 'a', 'ɡ': 'g', 'ι': 'i', 'ϲ': 'c', 'ｅ': 'e'
-        }
-        for char, replacement in homoglyph_map.items():
-            sanitized = sanitized.replace(char, replacement)
+        sanitized = sanitized.translate(HOMOGLYPHS)
         
         # Limit length to prevent excessive inputs
         if len(sanitized) > 200:
             sanitized = sanitized[:197] + '...'
             
         # Final cleanup pass - remove any suspicious character sequences
-        sanitized = re.sub(r'[^\w\s.,;:!?()[\]{}\/\'"@#$%^&*+=\-]', ' ', sanitized)
+        sanitized = SUSPICIOUS_CHARS.sub(' ', sanitized)
         
         # Normalize whitespace
-        sanitized = re.sub(r'\s+', ' ', sanitized).strip()
+        sanitized = WHITESPACE.sub(' ', sanitized).strip()
         
         return sanitized
 
+    def sanitize_categories(self, categories: List[str]) -> List[str]:
+        """Sanitize a category list, memoized since the same lists come back on every batch"""
+        key = tuple(categories)
+        sanitized = self._sanitized_categories.get(key)
+        if sanitized is None:
+            sanitized = [self.sanitize_input(category) for category in categories]
+            self._sanitized_categories.set(key, sanitized)
+        # Copy so callers can't modify the cached list
+        return list(sanitized)
+
     def is_safe_category(self, category: str, available_categories: List[str]) -> bool:
         """
         Validate that a category is legitimate and safe to use.
@@ -213,32 +303,26 @@ class OpenAICategorizer:
         return False
 
     async def wait_for_rate_limit(self):
-        """Implement rate limiting"""
+        """Implement rate limiting, waits in line for a token of the shared bucket"""
         if not self.client:
             return
             
-        now = datetime.now()
-        elapsed = (now - self.last_call_time).total_seconds()
-        
-        if elapsed < 60 and self.call_count >= self.rate_limit:
-            wait_time = 60 - elapsed
-            await asyncio.sleep(wait_time)
-            self.call_count = 0
-            self.last_call_time = datetime.now()
-        elif elapsed >= 60:
-            self.call_count = 0
-            self.last_call_time = now
+        await self.rate_limiter.acquire()
 
     async def suggest_categories_batch(self, 
                                     assignments: List[Tuple[str, Optional[str]]], 
                                     available_categories: List[str],
-                                    retry_count: int = 0) -> List[Tuple[str, float, List[str]]]:
-        """Process multiple assignments in a single API call with retry logic"""
+                                    deadline: Optional[float] = None) -> List[Tuple[str, float, List[str]]]:
+        """
+        Process multiple assignments in a single API call.
+        Assignments another request is already categorizing are not sent again, they await that request's result.
+        deadline is a time.monotonic() timestamp, assignments not categorized by then get a deadline_exceeded result;
+        the OpenAI call itself runs detached from any one caller, so it still serves the others and fills the cache.
+        """
         if not self.client or not assignments:
             return [(None, 0.0, []) for _ in assignments]
 
         start_time = time.time()
-        await self.wait_for_rate_limit()
         
         # Input validation
         if not available_categories or not all(isinstance(c, str) for c in available_categories):
@@ -258,195 +342,313 @@ class OpenAICategorizer:
         if not valid_assignments:
             return [(None, 0.0, []) for _ in assignments]
         
-        # Check cache before making API call
-        # Create a cache key based on assignments and categories
-        cache_key = self._create_cache_key(valid_assignments, available_categories)
-        cached_result = self._get_from_cache(cache_key)
-        if cached_result is not None:
-            self._cache_hits += 1
+        # Check the cache for each assignment before making an API call
+        cache_keys = [
+            self._create_cache_key(name, type_, available_categories)
+            for name, type_ in valid_assignments
+        ]
+        merged_results = self._get_many_from_cache(cache_keys)
+        uncached_indexes = [i for i, result in enumerate(merged_results) if result is None]
+        
+        self._cache_hits += len(valid_assignments) - len(uncached_indexes)
+        self._cache_misses += len(uncached_indexes)
+        
+        if not uncached_indexes:
             elapsed = time.time() - start_time
             print(f"Cache hit! Using cached categorization for {len(valid_assignments)} assignments (took {elapsed:.3f}s)")
-            return cached_result
+            return merged_results
+        
+        print(f"Cache miss for {len(uncached_indexes)} of {len(valid_assignments)} assignments. Processing them with OpenAI API")
         
-        self._cache_misses += 1
-        print(f"Cache miss. Processing {len(valid_assignments)} assignments with OpenAI API")
+        # Single-flight: the first request for a key starts the OpenAI call, concurrent ones await the same future
+        loop = asyncio.get_running_loop()
+        futures = {}
+        owned_indexes = []
+        for i in uncached_indexes:
+            future = self._inflight.get(cache_keys[i])
+            if future is None:
+                future = self._inflight[cache_keys[i]] = loop.create_future()
+                owned_indexes.append(i)
+            futures[i] = future
         
+        coalesced = len(uncached_indexes) - len(owned_indexes)
+        if coalesced:
+            self._coalesced += coalesced
+            print(f"Coalesced {coalesced} assignments with in-flight categorizations")
+        
+        if owned_indexes:
+            task = asyncio.create_task(self._categorize_in_flight(
+                [cache_keys[i] for i in owned_indexes],
+                [valid_assignments[i] for i in owned_indexes],
+                [futures[i] for i in owned_indexes],
+                available_categories
+            ))
+            # The event loop only keeps weak references to tasks
+            self._inflight_tasks.add(task)
+            task.add_done_callback(self._inflight_tasks.discard)
+        
+        for i in uncached_indexes:
+            # Shielded so a cancelled or timed out caller, the one that started the call included, leaves it running
+            try:
+                merged_results[i] = await asyncio.wait_for(asyncio.shield(futures[i]), self._remaining(deadline))
+            except asyncio.TimeoutError:
+                merged_results[i] = (None, 0.0, ["deadline_exceeded"])
+        
+        total_elapsed = time.time() - start_time
+        print(f"Categorized {len(uncached_indexes)} assignments, total processing time: {total_elapsed:.3f}s")
+        
+        return merged_results
+    
+    async def _categorize_in_flight(self,
+                                    cache_keys: List[str],
+                                    assignments: List[Tuple[str, Optional[str]]],
+                                    futures: List[asyncio.Future],
+                                    available_categories: List[str]) -> None:
+        """
+        Categorize assignments for every request awaiting their futures, caching the successful results.
+        Not bound to any caller's deadline, the client timeout and the retry limit bound it.
+        """
+        results = None
+        try:
+            results = await self._request_categorizations(assignments, available_categories)
+        except Exception as e:
+            print(f"In-flight categorization failed: {str(e)}")
+        finally:
+            # Always resolve the futures, even if the call was cancelled on shutdown, so waiters never hang
+            if results is None:
+                results = [(None, 0.0, ["request_failed"]) for _ in assignments]
+            for key, future, result in zip(cache_keys, futures, results):
+                if result[0] is not None:
+                    self._add_to_cache(key, result)
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                if not future.done():
+                    future.set_result(result)
+    
+    async def _request_categorizations(self,
+                                       uncached_assignments: List[Tuple[str, Optional[str]]],
+                                       available_categories: List[str],
+                                       deadline: Optional[float] = None) -> List[Tuple[str, float, List[str]]]:
+        """
+        Categorize assignments with a single OpenAI call, retrying on network/API errors while the deadline allows.
+        Returns error results straight away while the circuit breaker is open.
+        """
         # Sanitize inputs
         sanitized_assignments = []
-        for name, type_ in valid_assignments:
+        for name, type_ in uncached_assignments:
             sanitized_name = self.sanitize_input(name)
             sanitized_type = self.sanitize_input(type_)
             sanitized_assignments.append((sanitized_name, sanitized_type))
         
         # Sanitize categories
-        sanitized_categories = [self.sanitize_input(category) for category in available_categories]
-        
-        # Create a safe system message
-        system_message = "You are a helpful teaching assistant that categorizes academic assignments. Only respond with the exact format specified."
-        
-        prompt = """Given these assignments:
-
-"""
-        for i, (name, type_) in enumerate(sanitized_assignments, 1):
-            prompt += f"{i}. Name: {name}\n   Type: {type_ or 'Not specified'}\n\n"
+        sanitized_categories = self.sanitize_categories(available_categories)
         
-        # Present categories as a numbered list
-        prompt += "Available categories (REFERENCE BY NUMBER ONLY):\n"
+        # Static prefix first (system instructions, then the category table), the per-request items last,
+        # so consecutive requests share the longest possible prompt prefix for provider-side caching
+        prompt = "Available categories (REFERENCE BY NUMBER ONLY):\n"
         for i, category in enumerate(sanitized_categories, 1):
             prompt += f"{i}. {category}\n"
         
-        prompt += f"""
-==============================================================
-⚠️ CRITICAL INSTRUCTION - READ CAREFULLY ⚠️
-==============================================================
-YOU MUST RESPOND WITH THE CATEGORY NUMBER, NOT THE NAME.
-
-For each assignment above, categorize it into one of the available categories.
-Respond with one categorization per assignment, with a blank line between each.
-Number each categorization with the assignment number.
-
-Use this EXACT format for each assignment:
-
-Assignment Number: [number]
-Category Number: [category number from the list above]
-Confidence: [number 0-1]
-Reasons: [brief comma-separated list]
-
-Example:
-Assignment Number: a
-Category Number: 2
-Confidence: 0.95
-Reasons: quiz in name, numbered assessment
-
-Remember:
-- ALWAYS use the CATEGORY NUMBER from the numbered list above
-- DO NOT write out the category names in your response
-- Include all four lines per assignment
-- Confidence should be a decimal between 0 and 1
-- Leave a blank line between assignments
-"""
+        prompt += "\nAssignments:\n"
+        for i, (name, type_) in enumerate(sanitized_assignments, 1):
+            prompt += f"{i}. Name: {name} | Type: {type_ or 'Not specified'}\n"
 
-        try:
+        start_time = time.time()
+        error = None
+        for retry_count in range(self.max_retries + 1):
+            # Checked before taking a rate limit token, so calls skipped by an open breaker don't use up the budget
+            if not self.circuit_breaker.allow_request():
+                print("OpenAI circuit breaker open, using rule-based results")
+                error = "circuit_open"
+                break
+            
+            try:
+                await asyncio.wait_for(self.wait_for_rate_limit(), self._remaining(deadline))
+            except asyncio.TimeoutError:
+                self.circuit_breaker.release()
+                error = "deadline_exceeded"
+                break
+            
+            try:
+                results = await asyncio.wait_for(
+                    self._call_openai(prompt, sanitized_assignments, sanitized_categories),
+                    self._remaining(deadline)
+                )
+                self.circuit_breaker.record_success()
+                return results
+            except asyncio.TimeoutError:
+                # Our own deadline ran out, says nothing about the provider, whose timeouts raise APITimeoutError
+                self.circuit_breaker.release()
+                print(f"OpenAI API call hit the request deadline after {time.time() - start_time:.3f}s")
+                error = "deadline_exceeded"
+                break
+            except Exception as e:
+                self.circuit_breaker.record_failure()
+                elapsed = time.time() - start_time
+                print(f"OpenAI API error after {elapsed:.3f}s: {str(e)}")
+                error = f"api_error: {str(e)}"
+            
+            # Retry logic if network/API error, only if the backoff still leaves time for another call
+            delay = self.retry_delay * (retry_count + 1)  # Exponential backoff
+            remaining = self._remaining(deadline)
+            if retry_count >= self.max_retries or (remaining is not None and remaining <= delay):
+                break
+            await asyncio.sleep(delay)
+        
+        return [(None, 0.0, [error]) for _ in uncached_assignments]
+    
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left until the deadline, None when there is no deadline"""
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+    
+    async def _call_openai(self,
+                           prompt: str,
+                           sanitized_assignments: List[Tuple[str, str]],
+                           sanitized_categories: List[str]) -> List[Tuple[str, float, List[str]]]:
+        """Send one categorization prompt and parse the response, one result per assignment"""
+        async with self._request_slots:
             api_call_start = time.time()
-            self.call_count += 1
-            completion = await asyncio.to_thread(
-                self.client.chat.completions.create,
+            completion = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 temperature=0.1,
+                response_format={"type": "json_object"},
                 messages=[
-                    {"role": "system", "content": system_message},
+                    {"role": "system", "content": CATEGORIZATION_SYSTEM_MESSAGE},
                     {"role": "user", "content": prompt}
                 ]
             )
             api_call_time = time.time() - api_call_start
+        self.batcher.record(len(sanitized_assignments), api_call_time)
+        
+        response = completion.choices[0].message.content
+        print(f"OpenAI response: {response}")  # Debug logging
+        
+        return self._parse_response(response, sanitized_assignments, sanitized_categories)
+    
+    def _parse_response(self,
+                        response: str,
+                        sanitized_assignments: List[Tuple[str, str]],
+                        sanitized_categories: List[str]) -> List[Tuple[str, float, List[str]]]:
+        """Parse the JSON reply in one pass, one result per assignment in input order"""
+        try:
+            entries = json.loads(response).get("results", [])
+            if not isinstance(entries, list):
+                raise ValueError("results is not a list")
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"Error parsing OpenAI response: {str(e)}")
+            return [(None, 0.0, [f"parsing_error: {str(e)}"]) for _ in sanitized_assignments]
+        
+        # Index the entries by assignment number
+        by_index = {}
+        for entry in entries:
+            try:
+                by_index.setdefault(int(entry["a"]), entry)
+            except (KeyError, ValueError, TypeError):
+                continue
+        
+        results = []
+        for i, (name, _) in enumerate(sanitized_assignments, 1):
+            entry = by_index.get(i)
+            if entry is None:
+                print(f"No categorization found for assignment {i}: {name}")
+                results.append((None, 0.0, ["missing_categorization"]))
+                continue
             
-            response = completion.choices[0].message.content
-            print(f"OpenAI response: {response}")  # Debug logging
-            
-            # Parse response
-            results = []
-            # Split the response by blank lines to get individual assignment categorizations
-            categorizations = re.split(r'\n\s*\n', response.strip())
-            
-            for i, (name, _) in enumerate(sanitized_assignments):
-                try:
-                    # Find the matching categorization for this assignment
-                    assignment_index = i + 1
-                    matching_categorization = None
-                    
-                    for cat in categorizations:
-                        # Look for the assignment number
-                        assignment_match = re.search(r'Assignment\s*(?:Number)?:\s*(\d+)', cat, re.IGNORECASE)
-                        if assignment_match and int(assignment_match.group(1)) == assignment_index:
-                            matching_categorization = cat
-                            break
-                    
-                    if matching_categorization:
-                        # Extract category number, confidence, and reasons
-                        category_match = re.search(r'Category\s*(?:Number)?:\s*(\d+)', matching_categorization)
-                        confidence_match = re.search(r'Confidence:\s*([0-9.]+)', matching_categorization)
-                        reasons_match = re.search(r'Reasons:\s*(.+?)$', matching_categorization, re.MULTILINE | re.DOTALL)
-                        
-                        if category_match and confidence_match and reasons_match:
-                            category_num = int(category_match.group(1))
-                            confidence = float(confidence_match.group(1))
-                            reasons = [r.strip() for r in reasons_match.group(1).split(',')]
-                            
-                            # Convert category number to actual category name
-                            if 1 <= category_num <= len(sanitized_categories):
-                                category = sanitized_categories[category_num - 1]
-                                results.append((category, confidence, reasons))
-                            else:
-                                print(f"Invalid category number received from OpenAI: {category_num}")
-                                results.append((None, 0.0, ["invalid_category_number"]))
-                        else:
-                            print(f"Couldn't extract info for assignment {assignment_index}: {name}")
-                            results.append((None, 0.0, ["parsing_error"]))
-                    else:
-                        print(f"No categorization found for assignment {assignment_index}: {name}")
-                        results.append((None, 0.0, ["missing_categorization"]))
-                except Exception as e:
-                    print(f"Error parsing OpenAI response for assignment {i+1} ({name}): {str(e)}")
-                    results.append((None, 0.0, [f"parsing_error: {str(e)}"]))
-            
-            # Cache the results before returning
-            self._add_to_cache(cache_key, results)
-            
-            # Check if we need to save the cache to disk
-            if datetime.now() - self._last_save_time > self._save_interval:
-                self._save_cache_to_disk()
-                self._last_save_time = datetime.now()
-            
-            total_elapsed = time.time() - start_time
-            print(f"OpenAI API call took {api_call_time:.3f}s, total processing time: {total_elapsed:.3f}s")
+            try:
+                category_num = int(entry["c"])
+                confidence = float(entry["p"])
+                reasons = entry.get("r") or []
+                if isinstance(reasons, str):
+                    reasons = reasons.split(',')
+                reasons = [str(reason).strip() for reason in reasons]
+            except (KeyError, ValueError, TypeError):
+                print(f"Couldn't extract info for assignment {i}: {name}")
+                results.append((None, 0.0, ["parsing_error"]))
+                continue
             
+            # Convert category number to actual category name
+            if 1 <= category_num <= len(sanitized_categories):
+                results.append((sanitized_categories[category_num - 1], confidence, reasons))
+            else:
+                print(f"Invalid category number received from OpenAI: {category_num}")
+                results.append((None, 0.0, ["invalid_category_number"]))
+        
+        return results
+
+    def _create_cache_key(self, name: Optional[str], type_: Optional[str], categories: List[str]) -> str:
+        """
+        Create a cache key for a single assignment and the category set it was categorized against.
+        Uses a content hash instead of hash(), which is randomized per process, so keys survive restarts
+        and are the same in every worker.
+        Keyed on the name template, so "Homework 12" is answered by the entry learned from "Homework 3".
+        """
+        # Sort categories to ensure consistent keys regardless of order
+        payload = json.dumps([*series_key(name, type_), sorted(categories)])
+        
+        # Use a hash for shorter keys
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _get_many_from_cache(self, keys: List[str]) -> List[Optional[Tuple[str, float, List[str]]]]:
+        """
+        Retrieve the cached results of several keys, None for misses.
+        Local misses are fetched from the shared backend in a single MGET instead of one round trip each.
+        """
+        results = [self._cache.get(key) for key in keys]
+        if self.redis_client is None:
             return results
-            
+        
+        missing = list(dict.fromkeys(key for key, result in zip(keys, results) if result is None))
+        if not missing:
+            return results
+        
+        try:
+            cached_values = self.redis_client.mget([f"{CATEGORIZATION_CACHE_PREFIX}:{key}" for key in missing])
         except Exception as e:
-            elapsed = time.time() - start_time
-            print(f"OpenAI API error after {elapsed:.3f}s: {str(e)}")
-            # Retry logic if network/API error
-            if retry_count < self.max_retries:
-                await asyncio.sleep(self.retry_delay * (retry_count + 1))  # Exponential backoff
-                return await self.suggest_categories_batch(assignments, available_categories, retry_count+1)
-            return [(None, 0.0, [f"api_error: {str(e)}"]) for _ in valid_assignments]
-
-    def _create_cache_key(self, assignments: List[Tuple[str, Optional[str]]], categories: List[str]) -> str:
-        """Create a deterministic cache key from assignments and categories"""
-        # Sort assignments and categories to ensure consistent keys regardless of order
-        sorted_assignments = sorted([(name or "", type_ or "") for name, type_ in assignments])
-        sorted_categories = sorted(categories)
+            print(f"Shared categorization cache lookup failed: {e}")
+            return results
         
-        # Create a string representation
-        assignments_str = ";".join([f"{name}|{type_}" for name, type_ in sorted_assignments])
-        categories_str = ",".join(sorted_categories)
+        found = {}
+        for key, cached in zip(missing, cached_values):
+            if cached is None:
+                continue
+            try:
+                category, confidence, reasons = json.loads(cached)
+            except (ValueError, TypeError) as e:
+                print(f"Ignoring malformed shared cache entry {key}: {e}")
+                continue
+            found[key] = (category, confidence, reasons)
+            # Keep a local copy so repeated lookups skip the round trip
+            self._cache.set(key, found[key])
         
-        # Use a hash for shorter keys
-        return f"{hash(assignments_str)}:{hash(categories_str)}"
+        return [result if result is not None else found.get(key) for key, result in zip(keys, results)]
     
-    def _get_from_cache(self, key: str) -> Optional[List[Tuple[str, float, List[str]]]]:
-        """Retrieve result from cache if it exists and is not expired"""
-        if key not in self._cache:
-            return None
-            
-        timestamp, result = self._cache[key]
-        if datetime.now() - timestamp > self._cache_ttl:
-            # Cache expired
-            del self._cache[key]
-            return None
-            
-        return result
+    def _add_to_cache(self, key: str, result: Tuple[str, float, List[str]]) -> None:
+        """Add result to cache with current timestamp, and queue it for the disk store"""
+        timestamp = datetime.now()
+        self._cache.set(key, result)
+        self._store.put(key, timestamp, result)
+        
+        if self.redis_client is not None:
+            try:
+                self.redis_client.setex(
+                    f"{CATEGORIZATION_CACHE_PREFIX}:{key}",
+                    int(self._cache_ttl.total_seconds()),
+                    json.dumps(list(result))
+                )
+            except Exception as e:
+                print(f"Shared categorization cache store failed: {e}")
     
-    def _add_to_cache(self, key: str, result: List[Tuple[str, float, List[str]]]) -> None:
-        """Add result to cache with current timestamp"""
-        self._cache[key] = (datetime.now(), result)
-        
-        # Implement basic cache eviction if it gets too large
-        if len(self._cache) > 1000:  # Arbitrary limit
-            # Remove oldest entries
-            oldest_keys = sorted(self._cache.keys(), key=lambda k: self._cache[k][0])[:200]
-            for old_key in oldest_keys:
-                del self._cache[old_key]
+    def seed_cache(self, name: Optional[str], type_: Optional[str], categories: List[str],
+                   result: Tuple[str, float, List[str]], persist: bool = True) -> None:
+        """Store a known categorization, e.g. one a user confirmed, as if OpenAI had returned it"""
+        key = self._create_cache_key(name, type_, categories)
+        if persist:
+            self._add_to_cache(key, result)
+        else:
+            self._cache.set(key, result)
     
     def get_cache_stats(self) -> dict:
         """Return cache statistics"""
@@ -455,55 +657,77 @@ Remember:
             "cache_hits": self._cache_hits,
             "cache_misses": self._cache_misses,
             "hit_ratio": self._cache_hits / (self._cache_hits + self._cache_misses) if (self._cache_hits + self._cache_misses) > 0 else 0,
-            "last_save_time": self._last_save_time.isoformat() if hasattr(self, '_last_save_time') else None,
-            "cache_file": self.cache_file
+            "coalesced": self._coalesced,
+            "inflight": len(self._inflight),
+            "cache_file": self.cache_file,
+            "shared_backend": "redis" if self.redis_client is not None else None,
+            "memory_cache": self._cache.get_stats()
         }
         
     def clear_cache(self) -> None:
         """Clear the cache"""
-        self._cache = {}
+        self._cache.clear()
         # Also clear the disk cache
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
+        self._store.clear()
+        # And the shared backend
+        if self.redis_client is not None:
+            try:
+                for key in self.redis_client.scan_iter(match=f"{CATEGORIZATION_CACHE_PREFIX}:*"):
+                    self.redis_client.delete(key)
+            except Exception as e:
+                print(f"Shared categorization cache clear failed: {e}")
         print(f"Cache cleared (in-memory and disk file: {self.cache_file})")
         
     def _load_cache_from_disk(self) -> None:
-        """Load the cache from disk if it exists"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'rb') as f:
-                    disk_cache = pickle.load(f)
-                    
-                # Check for expired entries
-                now = datetime.now()
-                valid_entries = {
-                    k: v for k, v in disk_cache.items() 
-                    if now - v[0] <= self._cache_ttl
-                }
-                
-                self._cache = valid_entries
-                print(f"Loaded {len(valid_entries)} valid entries from disk cache")
-                
-                # If entries were removed due to expiration, save the cleaned cache
-                if len(valid_entries) < len(disk_cache):
-                    print(f"Removed {len(disk_cache) - len(valid_entries)} expired entries from cache")
-                    self._save_cache_to_disk()
-                    
-            except (pickle.PickleError, EOFError, FileNotFoundError) as e:
-                print(f"Error loading cache from disk: {str(e)}")
-                # Start with a fresh cache if there's an error
-                self._cache = {}
-        else:
-            print(f"No disk cache found at {self.cache_file}")
-            
-    def _save_cache_to_disk(self) -> None:
-        """Save the cache to disk"""
+        """Load the unexpired entries from the disk store"""
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self._cache, f)
-            print(f"Saved {len(self._cache)} entries to disk cache")
-        except (pickle.PickleError, IOError) as e:
-            print(f"Error saving cache to disk: {str(e)}")
+            entries = self._store.load(self._cache_ttl)
+        except Exception as e:
+            print(f"Error loading cache from disk: {str(e)}")
+            # Start with a fresh cache if there's an error
+            return
+        
+        # Oldest first, so the most recent entries survive if the store holds more than fits, and each entry
+        # only lives for what is left of its TTL
+        now = datetime.now()
+        for key, (timestamp, result) in sorted(entries.items(), key=lambda item: item[1][0]):
+            self._cache.set(key, result, ttl=(self._cache_ttl - (now - timestamp)).total_seconds())
+        print(f"Loaded {len(self._cache)} valid entries from disk cache")
+    
+    def start_background_expiry(self, interval: float = OPENAI_CACHE_EXPIRY_INTERVAL_SECONDS) -> None:
+        """Periodically drop expired entries from the in-memory cache, called on application startup"""
+        if self._expiry_task is not None:
+            return
+        
+        async def expire_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                removed = self._cache.expire()
+                if removed:
+                    print(f"Expired {removed} cached categorizations")
+        
+        self._expiry_task = asyncio.get_running_loop().create_task(expire_periodically())
+    
+    def stop_background_expiry(self) -> None:
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            self._expiry_task = None
+            
+    def flush_cache(self) -> None:
+        """Block until every cached result is written to disk"""
+        self._store.flush()
+        
+    def close(self) -> None:
+        """Flush the disk store and stop its writer, called on application shutdown"""
+        self._store.close()
+        print(f"Flushed {len(self._cache)} cached entries to {self.cache_file}")
+        
+    async def aclose(self) -> None:
+        """Stop the in-flight categorizations and close the pooled HTTP connections of the OpenAI client"""
+        for task in list(self._inflight_tasks):
+            task.cancel()
+        if self.client:
+            await self.client.close()
 
     @staticmethod
     def should_use_openai(rule_based_confidence: float) -> bool:
@@ -0,0 +1,91 @@
+"""
+Content-addressed cache for /calculate/raw responses.
+Repeated pastes of the same Blackboard page with the same categories are answered straight from Redis,
+skipping parsing, rule-based matching and OpenAI calls.
+"""
+from typing import Iterable, List, Optional
+import hashlib
+import json
+import os
+
+from .category_matcher import RULES_VERSION
+
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+
+class ResultCache:
+    """Stores serialized grade calculation responses in Redis under a hash of their inputs"""
+
+    key_prefix = "gradeflow:result"
+
+    def __init__(self, redis_client, ttl_seconds: int = RESULT_CACHE_TTL_SECONDS):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._hits = 0
+        self._misses = 0
+
+    def make_key(self, raw_text: str, available_categories: Optional[Iterable[str]] = None, scope: Optional[str] = None) -> str:
+        """
+        Build a stable key from the normalized paste and the category set.
+        Normalization matches the parser (stripped, non-empty lines), so whitespace-only differences still hit.
+        The rules version is part of the key, so changing the categorization rules invalidates old entries.
+        scope separates results that depend on more than the input, e.g. a user's own past categorizations.
+        """
+        digest = hashlib.sha256()
+        for line in raw_text.splitlines():
+            line = line.strip()
+            if line:
+                digest.update(line.encode('utf-8'))
+                digest.update(b'\n')
+
+        categories: List[str] = sorted(set(available_categories)) if available_categories else []
+        digest.update(b'\x00')
+        digest.update(json.dumps(categories).encode('utf-8'))
+        if scope:
+            digest.update(b'\x00')
+            digest.update(scope.encode('utf-8'))
+
+        return f"{self.key_prefix}:{RULES_VERSION}:{digest.hexdigest()}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached JSON response body, or None on a miss"""
+        try:
+            cached = self.redis_client.get(key)
+        except Exception as e:
+            # Never fail a calculation because the cache is unavailable
+            print(f"Result cache lookup failed: {e}")
+            cached = None
+
+        if cached is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return cached
+
+    def set(self, key: str, body: str) -> None:
+        """Store a JSON response body with the configured TTL"""
+        try:
+            self.redis_client.setex(key, self.ttl_seconds, body)
+        except Exception as e:
+            print(f"Result cache store failed: {e}")
+
+    def clear(self) -> int:
+        """Drop every cached response, returns the number of entries removed"""
+        removed = 0
+        try:
+            for key in self.redis_client.scan_iter(match=f"{self.key_prefix}:*"):
+                removed += self.redis_client.delete(key)
+        except Exception as e:
+            print(f"Result cache clear failed: {e}")
+        return removed
+
+    def get_stats(self) -> dict:
+        """Return cache statistics"""
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / total if total > 0 else 0,
+            "ttl_seconds": self.ttl_seconds,
+            "rules_version": RULES_VERSION
+        }
@@ -4,6 +4,32 @@ This module prevents circular imports while allowing for shared caching.
 """
 
 from .openai_integration import OpenAICategorizer
+from .result_cache import ResultCache
+from .token_bucket import TokenBucketRateLimiter
+from .category_lookup import CategoryLookup
+from .local_classifier import LocalClassifier
+from .user_category_index import UserCategoryIndex
+from ..auth.session_manager import session_manager
+import os
+
+# Where categorizations are shared between workers, "redis" (default) or "memory" for a per-process cache only
+OPENAI_CACHE_BACKEND = os.getenv("OPENAI_CACHE_BACKEND", "redis").lower()
 
 # Shared OpenAI categorizer with memoization
-openai_categorizer = OpenAICategorizer() 
\ No newline at end of file
+openai_categorizer = OpenAICategorizer(
+    redis_client=session_manager.redis_client if OPENAI_CACHE_BACKEND == "redis" else None,
+    # One OpenAI rate limit for all workers
+    rate_limiter=TokenBucketRateLimiter(session_manager.redis_client)
+)
+
+# Names users already filed under a category, filled by the cache warm-up
+category_lookup = CategoryLookup()
+
+# Offline-trained model for names the rules and lookups don't know, loaded on startup
+local_classifier = LocalClassifier()
+
+# Each user's own past categorizations, stored in the session Redis
+user_category_index = UserCategoryIndex(session_manager.redis_client)
+
+# Shared cache of full /calculate/raw responses, stored in the session Redis
+result_cache = ResultCache(session_manager.redis_client)
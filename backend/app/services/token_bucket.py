@@ -0,0 +1,135 @@
+"""
+Token-bucket rate limiter for OpenAI calls, shared by every worker through Redis.
+Waiters in a process queue up in arrival order instead of each sleeping on its own, and the queue depth is exposed as a metric.
+Falls back to a process-local bucket while Redis can't run the script (e.g. during an outage, or fakeredis without Lua),
+and tries Redis again after a short backoff.
+"""
+from typing import Optional
+import asyncio
+import os
+import time
+
+OPENAI_RATE_LIMIT_PER_MINUTE = float(os.getenv("OPENAI_RATE_LIMIT_PER_MINUTE", "20"))
+# Calls allowed back to back after an idle period, defaults to a full minute's worth like the old per-minute window
+OPENAI_RATE_LIMIT_BURST = float(os.getenv("OPENAI_RATE_LIMIT_BURST", str(OPENAI_RATE_LIMIT_PER_MINUTE)))
+# Seconds the local bucket is used after a Redis error before the shared bucket is tried again
+OPENAI_RATE_LIMIT_REDIS_RETRY_SECONDS = float(os.getenv("OPENAI_RATE_LIMIT_REDIS_RETRY_SECONDS", "5"))
+
+# Refills the bucket for the elapsed time and takes a token if one is available.
+# Returns 0 when a token was taken, otherwise the seconds until one will be (as a string, Redis truncates Lua numbers)
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated'))
+if tokens == nil or updated == nil then
+    tokens = capacity
+    updated = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+class TokenBucketRateLimiter:
+    """Async token bucket, backed by Redis when a client is given"""
+
+    key = "gradeflow:openai:ratelimit"
+
+    def __init__(self,
+                 redis_client=None,
+                 rate_per_minute: float = OPENAI_RATE_LIMIT_PER_MINUTE,
+                 burst: float = OPENAI_RATE_LIMIT_BURST,
+                 redis_retry_seconds: float = OPENAI_RATE_LIMIT_REDIS_RETRY_SECONDS):
+        self.rate = rate_per_minute / 60.0  # tokens per second
+        self.capacity = max(1.0, burst)
+        self.redis_client = redis_client
+        self.redis_retry_seconds = redis_retry_seconds
+        self._script = redis_client.register_script(TAKE_TOKEN_SCRIPT) if redis_client is not None else None
+        # When the script last failed, None while Redis is healthy
+        self._redis_failed_at: Optional[float] = None
+        self._redis_failures = 0
+
+        # Local bucket, used without Redis or while the script fails
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+        # asyncio.Lock wakes waiters in FIFO order, so the oldest waiter always gets the next token
+        self._lock: Optional[asyncio.Lock] = None
+        self._waiting = 0
+        self._acquired = 0
+        self._total_wait = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for a token, in arrival order with the other waiters of this process"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = self._take()
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+
+        self._acquired += 1
+        self._total_wait += time.monotonic() - start
+
+    def _take(self) -> float:
+        """Try to take a token, returns 0 on success or the seconds to wait before retrying"""
+        if self._script is not None and not self._backing_off():
+            try:
+                wait = float(self._script(keys=[self.key], args=[self.capacity, self.rate, time.time()]))
+            except Exception as e:
+                self._redis_failed_at = time.monotonic()
+                self._redis_failures += 1
+                print(f"Shared OpenAI rate limiter unavailable, using a local bucket for {self.redis_retry_seconds:g}s: {e}")
+            else:
+                if self._redis_failed_at is not None:
+                    print("Shared OpenAI rate limiter available again")
+                    self._redis_failed_at = None
+                return wait
+        return self._take_local()
+
+    def _backing_off(self) -> bool:
+        """Whether Redis failed too recently to be tried again"""
+        return self._redis_failed_at is not None and time.monotonic() - self._redis_failed_at < self.redis_retry_seconds
+
+    def _take_local(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of coroutines of this process waiting for a token"""
+        return self._waiting
+
+    def get_stats(self) -> dict:
+        """Return rate limiter statistics"""
+        return {
+            "backend": "redis" if self._script is not None and self._redis_failed_at is None else "local",
+            "redis_failures": self._redis_failures,
+            "rate_per_minute": self.rate * 60,
+            "burst": self.capacity,
+            "queue_depth": self._waiting,
+            "acquired": self._acquired,
+            "avg_wait_seconds": self._total_wait / self._acquired if self._acquired else 0
+        }
@@ -0,0 +1,132 @@
+"""
+Per-user index of the categories users picked for their assignments in saved calculations.
+Consulted right after the rule-based matcher, so returning users re-pasting a course get their own choices back
+without an OpenAI call. Stored as one Redis hash per user, updated on save, and rebuilt from the database when missing
+or when a saved calculation is edited or deleted, so choices the user took back stop answering.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+
+from ..database.models import Category, SavedCalculation
+from .category_lookup import confirmed_assignments, lookup_key
+
+USER_CATEGORY_INDEX_TTL_SECONDS = int(os.getenv("USER_CATEGORY_INDEX_TTL_SECONDS", str(90 * 24 * 3600)))
+
+# Confidence of a category the user picked themselves
+USER_CHOICE_CONFIDENCE = 0.98
+
+# Hash field marking an index as built, so users without saved assignments don't trigger a rebuild every time
+BUILT_MARKER = "__built__"
+
+def index_field(name: Optional[str], assignment_type: Optional[str]) -> str:
+    """Hash field of an assignment, normalized names never contain tabs"""
+    return "\t".join(lookup_key(name, assignment_type))
+
+def entries_from_categories(categories: Iterable[dict]) -> Dict[str, str]:
+    """Map each saved assignment to the category it was filed under, hypothetical assignments are skipped"""
+    return {
+        index_field(name, assignment_type): category
+        for name, assignment_type, category in confirmed_assignments(categories)
+    }
+
+def lookup_user_category(entries: Optional[Dict[str, str]],
+                         name: Optional[str],
+                         assignment_type: Optional[str],
+                         available_categories: List[str]) -> Optional[Tuple[str, float, List[str]]]:
+    """Return (category, confidence, reasons) if the user filed this assignment under one of the available categories"""
+    if not entries:
+        return None
+    category = entries.get(index_field(name, assignment_type))
+    if category is None:
+        return None
+    category = category.strip().lower()
+    for available in available_categories:
+        if available.strip().lower() == category:
+            return available, USER_CHOICE_CONFIDENCE, ["user_history"]
+    return None
+
+class UserCategoryIndex:
+    """Redis hash per user of normalized (name, type) -> category name, with a version bumped on every change"""
+
+    key_prefix = "gradeflow:user_categories"
+
+    def __init__(self, redis_client, ttl_seconds: int = USER_CATEGORY_INDEX_TTL_SECONDS):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}:{user_id}"
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}:{user_id}:version"
+
+    def _write(self, user_id: int, entries: Dict[str, str], replace: bool = False) -> None:
+        pipe = self.redis_client.pipeline()
+        if replace:
+            pipe.delete(self._key(user_id))
+        pipe.hset(self._key(user_id), mapping={BUILT_MARKER: "1", **entries})
+        pipe.expire(self._key(user_id), self.ttl_seconds)
+        pipe.incr(self._version_key(user_id))
+        pipe.expire(self._version_key(user_id), self.ttl_seconds)
+        pipe.execute()
+
+    def update(self, user_id: int, categories: Iterable[dict]) -> None:
+        """Record the choices of a saved calculation, the latest choice for a name wins"""
+        try:
+            # Not built yet: the next load rebuilds it from the database, this calculation included
+            if not self.redis_client.exists(self._key(user_id)):
+                return
+            self._write(user_id, entries_from_categories(categories))
+        except Exception as e:
+            print(f"User category index update failed: {e}")
+
+    def load(self, user_id: int, db) -> Dict[str, str]:
+        """Return the user's index, building it from their saved calculations if it is missing"""
+        try:
+            entries = self.redis_client.hgetall(self._key(user_id))
+        except Exception as e:
+            print(f"User category index lookup failed: {e}")
+            return {}
+
+        if not entries:
+            entries = self.rebuild(user_id, db)
+        entries.pop(BUILT_MARKER, None)
+        return entries
+
+    def rebuild(self, user_id: int, db) -> Dict[str, str]:
+        """Build the index from every saved calculation of the user in one query, replacing the stored one"""
+        try:
+            rows = (
+                db.query(Category.name, Category.assignments)
+                .join(SavedCalculation, Category.calculation_id == SavedCalculation.id)
+                .filter(SavedCalculation.user_id == user_id)
+                # Oldest first, so the latest choice for a name wins
+                .order_by(SavedCalculation.created_at.asc(), SavedCalculation.id.asc())
+                .all()
+            )
+        except Exception as e:
+            print(f"User category index rebuild failed: {e}")
+            # Drop the stale index, the next load builds it again
+            try:
+                self.redis_client.delete(self._key(user_id))
+            except Exception:
+                pass
+            return {}
+        entries = entries_from_categories({"name": name, "assignments": assignments} for name, assignments in rows)
+
+        try:
+            self._write(user_id, entries, replace=True)
+        except Exception as e:
+            print(f"User category index store failed: {e}")
+        return entries
+
+    def cache_scope(self, user_id: Optional[int], entries: Optional[Dict[str, str]]) -> Optional[str]:
+        """Result cache scope for a user with an index, changes whenever their index does"""
+        if not user_id or not entries:
+            return None
+        try:
+            version = self.redis_client.get(self._version_key(user_id)) or "0"
+        except Exception as e:
+            print(f"User category index version lookup failed: {e}")
+            return None
+        return f"user:{user_id}:{version}"
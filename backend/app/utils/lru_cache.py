@@ -0,0 +1,106 @@
+"""
+Small bounded LRU cache used to memoize hot lookups, with hit/miss counters for the stats endpoints.
+Entries can optionally expire after a TTL.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import time
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Least-recently-used mapping with a fixed number of entries.
+    Lookups and inserts are O(1); the oldest entry is evicted once maxsize is exceeded.
+    With a ttl (seconds), entries also expire: lazily on lookup, and in bulk through expire().
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        # Expiry times in write order, which is expiry order as long as every entry gets the same TTL
+        self._expires: "OrderedDict[Hashable, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value and mark it as recently used"""
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Insert or refresh a value, evicting the least recently used entry if full. ttl overrides the default"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+            self._expires.move_to_end(key)
+        else:
+            self._expires.pop(key, None)
+
+        if len(self._data) > self.maxsize:
+            oldest, _ = self._data.popitem(last=False)
+            self._expires.pop(oldest, None)
+            self.evictions += 1
+
+    def expire(self) -> int:
+        """
+        Drop expired entries, returns how many were removed.
+        Walks the entries in write order and stops at the first live one, so the cost is proportional to what is removed.
+        """
+        now = time.monotonic()
+        removed = 0
+        while self._expires:
+            key, expires_at = next(iter(self._expires.items()))
+            if expires_at > now:
+                break
+            self._remove(key)
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def _remove(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+        self._expires.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expires.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get_stats(self) -> dict:
+        """Return cache statistics"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / total if total > 0 else 0
+        }
@@ -0,0 +1,95 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, for benchmarks and tests.
+A plain asyncio HTTP/1.1 server with keep-alive, so the client's real connection pool is exercised.
+Every request waits a fixed latency and answers each assignment of the prompt with category 1.
+"""
+import asyncio
+import json
+import re
+from typing import Optional
+
+ASSIGNMENT_LINE = re.compile(r'^(\d+)\. Name: ', re.MULTILINE)
+
+class MockOpenAIServer:
+    """Counts requests, connections and the most requests it was handling at once"""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def start(self) -> "MockOpenAIServer":
+        self._server = await asyncio.start_server(self._handle_connection, "127.0.0.1", 0, backlog=1024)
+        return self
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    await asyncio.sleep(self.latency)
+                    payload = json.dumps(self._completion(body)).encode("utf-8")
+                finally:
+                    self.in_flight -= 1
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(payload)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _completion(body: bytes) -> dict:
+        prompt = json.loads(body)["messages"][-1]["content"]
+        results = [{"a": int(number), "c": 1, "p": 0.9, "r": ["mock"]} for number in ASSIGNMENT_LINE.findall(prompt)]
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps({"results": results})},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
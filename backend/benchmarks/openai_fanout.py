@@ -0,0 +1,79 @@
+"""
+Fan-out benchmark of OpenAICategorizer against the local mock OpenAI server.
+Fires N concurrent single-assignment categorizations (distinct names, so nothing is cached or coalesced)
+and reports the wall time against the serial time, and how many requests the server saw at once.
+Run from backend/: python -m benchmarks.openai_fanout [--calls 500] [--latency 0.1] [--max-connections 200]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from .mock_openai_server import MockOpenAIServer
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+
+def distinct_name(i: int) -> str:
+    """Names without digits, numbered names would share one series template and be coalesced"""
+    letters = ""
+    while True:
+        i, remainder = divmod(i, 26)
+        letters = chr(ord("a") + remainder) + letters
+        if i == 0:
+            return f"Topic {letters}"
+
+async def run_fanout(calls: int, latency: float) -> dict:
+    """Categorize `calls` assignments concurrently against a fresh mock server and categorizer"""
+    from app.services.openai_integration import OpenAICategorizer
+    from app.services.token_bucket import TokenBucketRateLimiter
+
+    async with MockOpenAIServer(latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        with tempfile.TemporaryDirectory() as cache_dir:
+            categorizer = OpenAICategorizer(
+                api_key="benchmark",
+                cache_dir=cache_dir,
+                # The benchmark measures the client, not the provider's rate limit
+                rate_limiter=TokenBucketRateLimiter(rate_per_minute=1e9, burst=1e9)
+            )
+            try:
+                # The categorizer logs every call, keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    results = await asyncio.gather(*(
+                        categorizer.suggest_categories_batch([(distinct_name(i), None)], CATEGORIES)
+                        for i in range(calls)
+                    ))
+                    elapsed = time.perf_counter() - start
+            finally:
+                await categorizer.aclose()
+                categorizer.close()
+
+        return {
+            "calls": calls,
+            "categorized": sum(1 for batch in results for category, _, _ in batch if category),
+            "elapsed_seconds": round(elapsed, 3),
+            "serial_seconds": round(calls * latency, 3),
+            "speedup": round(calls * latency / elapsed, 1),
+            "max_in_flight": server.max_in_flight,
+            "connections": server.connections
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent OpenAI categorizations against a local mock server")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds the mock server takes per request")
+    parser.add_argument("--max-connections", type=int, default=None, help="overrides OPENAI_MAX_CONNECTIONS")
+    args = parser.parse_args()
+
+    # Read by openai_integration at import
+    if args.max_connections is not None:
+        os.environ["OPENAI_MAX_CONNECTIONS"] = str(args.max_connections)
+
+    print(asyncio.run(run_fanout(args.calls, args.latency)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Batch size learning of the adaptive batcher.
+"""
+from app.services.adaptive_batcher import EXPLORE_RETRY, EXPLORE_WINDOW, MIN_SAMPLES, AdaptiveBatcher
+
+def latency(size):
+    return 1.0 + 0.1 * size
+
+def run(batcher, requests, available):
+    """Send requests of target_size() assignments, or fewer when traffic only has `available`"""
+    sizes = []
+    for _ in range(requests):
+        size = min(batcher.target_size(), available)
+        batcher.record(size, latency(size))
+        sizes.append(size)
+    return sizes
+
+def test_larger_size_that_never_fills_is_given_up():
+    batcher = AdaptiveBatcher()
+    # Traffic never holds more than 2 assignments at once
+    run(batcher, MIN_SAMPLES, available=2)
+    assert batcher.target_size() == 3
+
+    run(batcher, EXPLORE_WINDOW + 2 * MIN_SAMPLES, available=2)
+    assert batcher.target_size() == 2
+    assert set(run(batcher, 50, available=2)) == {2}
+
+def test_given_up_size_is_explored_again_later():
+    batcher = AdaptiveBatcher()
+    run(batcher, MIN_SAMPLES + EXPLORE_WINDOW + 2 * MIN_SAMPLES, available=2)
+    assert batcher.target_size() == 2
+
+    # Traffic grew, the larger size is tried again and learned
+    sizes = run(batcher, EXPLORE_RETRY + EXPLORE_WINDOW, available=20)
+    assert sizes[0] == 2
+    assert 3 in sizes
+    assert batcher.get_stats()["observed"]["3"]["samples"] >= MIN_SAMPLES
+
+def test_explores_only_from_a_trusted_size():
+    batcher = AdaptiveBatcher()
+    assert batcher.target_size() == 5
+    batcher.record(5, latency(5))
+    assert batcher.target_size() == 5
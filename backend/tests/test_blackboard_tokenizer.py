@@ -0,0 +1,102 @@
+"""
+Golden-output equivalence of the line tokenizer with the regex scan it replaced.
+The regex path is pinned below exactly as grade_parser ran it, rows are compared field by field.
+"""
+import random
+import re
+
+import pytest
+
+from app.services.blackboard_tokenizer import BlackboardTokenizer, tokenize_blackboard_text
+
+# Pinned copy of the original block pattern in parse_blackboard_grades
+REGEX_BLOCK = re.compile(
+    r'(?P<name>[^\n]+)\n'
+    r'(?:Due:[^\n]+\n)?'
+    r'(?:(?P<type>Assignment|Discussion|Test|Blog|Quiz|Exam)\n)?'
+    r'(?:[A-Za-z]+ \d{1,2}, \d{4}(?:[^\n]*(?:AM|PM))?\n)?'
+    r'(?P<status>Graded|Upcoming)\n'
+    r'(?P<score>\s*-|\s*[0-9.]+)\n'
+    r'/(?P<total>[0-9.]+)',
+    re.MULTILINE
+)
+
+def regex_rows(raw_text):
+    """(name, status, score, total, type) of each block, found the way the regex path did"""
+    clean_text = '\n'.join(line.strip() for line in raw_text.splitlines() if line.strip())
+    rows = []
+    for match in REGEX_BLOCK.finditer(clean_text):
+        lines_before_status = clean_text[:match.start('status')].split('\n')
+        assignment_type = 'Test' if len(lines_before_status) >= 2 and 'Test' in lines_before_status[-2] else None
+        rows.append((match.group('name').strip(), match.group('status'), match.group('score'),
+                     match.group('total'), assignment_type))
+    return rows
+
+def tokenizer_rows(rows):
+    return [(row.name.strip(), row.status, row.score, row.total, row.assignment_type) for row in rows]
+
+FIXTURES = [
+    "Quiz 1\nGraded\n8\n/10",
+    "Homework 2\nDue: Jan 5, 2024\nAssignment\nJanuary 5, 2024 11:59 PM\nGraded\n9.5\n/10",
+    "Midterm\nTest\nMarch 12, 2024\nGraded\n-\n/100",
+    "Lab Test 2\nUpcoming\n-\n/20",
+    "-Needs Grading Essay 1\nGraded\n7\n/10 pts\nQuiz 2\nGraded\n5\n/5",
+    "Quiz 3\nGraded\n1.2.3\n/10",
+    "Quiz 4\nGraded\n10\n/10Test\nGraded\n4\n/5",
+    "Test\nGraded\n4\n/5",
+    "Final\n\n   Exam\n  Graded  \n 90 \n/100\n",
+    "Paper 1\r\nGraded\r\n12\r\n/15\r\n",
+    "Header line\nSomething else\nQuiz 5\nGraded\nx\n/10\nQuiz 6\nGraded\n3\n/x",
+    "Due: Jan 1\nGraded\n3\n/4",
+    "",
+]
+
+# Lines that exercise every optional and malformed branch when mixed at random
+POOL = ["Quiz 1", "HW3", "Due: Jan 5", "Due:", "Test", "Assignment", "Exam", "Blog", "Quiz",
+        "January 5, 2024 11:59 PM", "Jan 5, 2024", "Jan 5, 2024 noon", "Graded", "Upcoming", "-", "10", "9.5", "1.2.3",
+        "/10", "/10 pts", "/1.0Test", "/x", "  ", "", "Lab Test 2", "-Needs Grading", "   Final  ", "10 -", "/",
+        "Midterm Test", "Upcoming\x0bGraded", "Graded -", "/5\r\n7"]
+
+def random_paste(seed, blocks=60):
+    """Mix of well-formed blocks and stray lines, with varying separators and indentation"""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(blocks):
+        if rng.random() < 0.5:
+            block = [rng.choice(["Quiz 1", "Lab Test 2", "Graded", "Test", "/4 Test"])]
+            if rng.random() < 0.5:
+                block.append("Due: Jan 1, 2024")
+            if rng.random() < 0.5:
+                block.append(rng.choice(["Test", "Quiz", "Exam"]))
+            if rng.random() < 0.5:
+                block.append(rng.choice(["Jan 5, 2024", "March 12, 2024 11:59 PM"]))
+            block.append(rng.choice(["Graded", "Upcoming"]))
+            block.append(rng.choice(["-", "10", "7.5", "1.2.3"]))
+            block.append(rng.choice(["/10", "/10 extra", "/1.2.3", "/100"]))
+            lines.extend(block)
+        else:
+            lines.append(rng.choice(POOL))
+    separator = rng.choice(["\n", "\r\n", "\n\n  "])
+    return separator.join("  " + line if rng.random() < 0.2 else line for line in lines)
+
+@pytest.mark.parametrize("raw_text", FIXTURES)
+def test_fixtures_match_regex_path(raw_text):
+    assert tokenizer_rows(tokenize_blackboard_text(raw_text)) == regex_rows(raw_text)
+
+def test_random_pastes_match_regex_path():
+    mismatches = []
+    for seed in range(2000):
+        raw_text = random_paste(seed)
+        if tokenizer_rows(tokenize_blackboard_text(raw_text)) != regex_rows(raw_text):
+            mismatches.append(seed)
+    assert mismatches == []
+
+def test_incremental_feed_matches_whole_text():
+    for seed in range(200):
+        raw_text = random_paste(seed)
+        tokenizer = BlackboardTokenizer()
+        rows = []
+        for line in raw_text.splitlines():
+            rows.extend(tokenizer.feed(line))
+        rows.extend(tokenizer.finish())
+        assert tokenizer_rows(rows) == regex_rows(raw_text)
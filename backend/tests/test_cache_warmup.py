@@ -0,0 +1,92 @@
+"""
+Warm-up of the lookup table and the OpenAI categorization cache from saved calculations.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base
+from app.database.models import Category, SavedCalculation
+from app.services import cache_warmup
+from app.services.cache_warmup import warm_up_caches
+from app.services.category_lookup import CategoryLookup
+
+class RecordingCategorizer:
+    def __init__(self):
+        self.seeded = []
+
+    def sanitize_input(self, text):
+        return text
+
+    def seed_cache(self, name, type_, categories, result, persist=True):
+        self.seeded.append((name, result[0], persist))
+
+@pytest.fixture
+def db():
+    # One shared connection, the background warm-up reads from a thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def add_calculation(db, user_id, categories):
+    calculation = SavedCalculation(user_id=user_id, name="calc", raw_data="", results={"calculation_mode": "blackboard"})
+    db.add(calculation)
+    db.flush()
+    for category, names in categories.items():
+        db.add(Category(calculation_id=calculation.id, name=category, weight=50,
+                        assignments=[{"name": name} for name in names]))
+    db.commit()
+
+def test_only_series_several_users_agree_on_are_seeded(db):
+    add_calculation(db, 1, {"Homework": ["Reflection", "Essay A"], "Quizzes": ["Quiz 3"]})
+    add_calculation(db, 1, {"Homework": ["Reflection", "Essay A"], "Quizzes": ["Quiz 3"]})
+    add_calculation(db, 2, {"Homework": ["Reflection"], "Quizzes": ["Quiz 3"]})
+    add_calculation(db, 3, {"Homework": ["Reflection"], "Quizzes": []})
+
+    categorizer = RecordingCategorizer()
+    lookup = CategoryLookup()
+    stats = warm_up_caches(db, categorizer, lookup)
+
+    assert stats["calculations"] == 4
+    # "Essay A" was only ever saved by user 1, "Quiz 3" by two users is an answer for that name but not for the series
+    assert [name for name, _, _ in categorizer.seeded] == ["Reflection"]
+    assert lookup.lookup("Essay A", None, ["Homework", "Quizzes"]) is None
+    assert lookup.lookup("Quiz 3", None, ["Homework", "Quizzes"])[0] == "Quizzes"
+    assert lookup.lookup("Reflection", None, ["Homework", "Quizzes"])[0] == "Homework"
+
+def test_one_save_doesnt_answer_a_series(db):
+    add_calculation(db, 1, {"Quizzes": ["Quiz 3"]})
+
+    categorizer = RecordingCategorizer()
+    lookup = CategoryLookup()
+    warm_up_caches(db, categorizer, lookup)
+
+    assert categorizer.seeded == []
+    assert lookup.lookup("Quiz 12", None, ["Homework", "Quizzes"]) is None
+
+def test_background_warm_up_keeps_saves_made_meanwhile(db, monkeypatch):
+    add_calculation(db, 1, {"Homework": ["Reflection"]})
+    lookup = CategoryLookup()
+
+    collect = cache_warmup.collect_confirmed_assignments
+
+    def collect_during_save(session, limit):
+        calculations = collect(session, limit)
+        # A /save lands while the rebuild reads the database
+        lookup.add_calculation([("Reflection", None, "Homework")], voter=2)
+        return calculations
+
+    monkeypatch.setattr(cache_warmup, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+    monkeypatch.setattr(cache_warmup, "collect_confirmed_assignments", collect_during_save)
+    asyncio.run(cache_warmup.warm_up_in_background(RecordingCategorizer(), lookup))
+
+    assert lookup.lookup("Reflection", None, ["Homework", "Quizzes"])[2] == ["history:2_of_2_saved"]
@@ -0,0 +1,71 @@
+"""
+Shared categorization cache: local misses are fetched from Redis in one round trip.
+"""
+import pytest
+
+pytest.importorskip("openai")
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.openai_integration import OpenAICategorizer
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+
+class CountingRedis:
+    """Forwards to a FakeRedis and counts the commands sent"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return attribute(*args, **kwargs)
+        return call
+
+@pytest.fixture
+def shared_redis():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def make_categorizer(tmp_path, redis_client, name):
+    return OpenAICategorizer(api_key=None, cache_dir=str(tmp_path / name), redis_client=redis_client)
+
+def test_local_misses_use_one_mget(tmp_path, shared_redis):
+    writer = make_categorizer(tmp_path, shared_redis, "writer")
+    names = [f"Assignment {chr(ord('a') + i)}" for i in range(20)]
+    for name in names[:15]:
+        writer._add_to_cache(writer._create_cache_key(name, None, CATEGORIES), ("Homework", 0.9, ["test"]))
+    writer.close()
+
+    counting = CountingRedis(shared_redis)
+    reader = make_categorizer(tmp_path, counting, "reader")
+    try:
+        keys = [reader._create_cache_key(name, None, CATEGORIES) for name in names]
+        results = reader._get_many_from_cache(keys + keys[:3])
+
+        assert counting.calls == ["mget"]
+        assert results[:15] == [("Homework", 0.9, ["test"])] * 15
+        assert results[15:20] == [None] * 5
+        assert results[20:] == results[:3]
+
+        # Now held locally, a second lookup doesn't touch Redis for them
+        counting.calls.clear()
+        reader._get_many_from_cache(keys[:15])
+        assert counting.calls == []
+    finally:
+        reader.close()
+
+def test_redis_errors_count_as_misses(tmp_path):
+    class BrokenRedis:
+        def mget(self, keys):
+            raise ConnectionError("down")
+
+    categorizer = make_categorizer(tmp_path, BrokenRedis(), "broken")
+    try:
+        assert categorizer._get_many_from_cache(["a", "b"]) == [None, None]
+    finally:
+        categorizer.close()
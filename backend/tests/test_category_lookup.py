@@ -0,0 +1,107 @@
+"""
+Vote thresholds of the category lookup table.
+"""
+import json
+
+from app.services import category_lookup
+from app.services.category_lookup import CategoryLookup
+
+CATEGORIES = ["Homework", "Quizzes", "Labs"]
+
+def save(lookup, voter, *assignments):
+    lookup.add_calculation(list(assignments), voter=voter)
+
+def test_single_user_is_not_an_answer():
+    lookup = CategoryLookup()
+    save(lookup, 1, ("Pop Quiz A", None, "Quizzes"))
+    assert lookup.lookup("Pop Quiz A", None, CATEGORIES) is None
+
+    # Saving again doesn't add a vote, it replaces the user's previous one
+    save(lookup, 1, ("Pop Quiz A", None, "Quizzes"))
+    assert lookup.lookup("Pop Quiz A", None, CATEGORIES) is None
+
+    save(lookup, 2, ("pop quiz  a", None, "quizzes"))
+    category, confidence, reasons = lookup.lookup("Pop Quiz A", None, CATEGORIES)
+    assert category == "Quizzes"
+    assert confidence == 0.95
+    assert reasons == ["history:2_of_2_saved"]
+
+def test_latest_choice_of_a_user_counts():
+    lookup = CategoryLookup()
+    save(lookup, 1, ("Reflection", None, "Homework"))
+    save(lookup, 2, ("Reflection", None, "Homework"))
+    save(lookup, 1, ("Reflection", None, "Labs"))
+    assert lookup.lookup("Reflection", None, CATEGORIES) is None
+    assert lookup.get_stats()["votes"] == 2
+
+def test_template_needs_three_users():
+    lookup = CategoryLookup()
+    for voter in (1, 2):
+        save(lookup, voter, ("Lab 1", None, "Labs"), ("Lab 2", None, "Labs"))
+    assert lookup.lookup("Lab 7", None, CATEGORIES) is None
+
+    save(lookup, 1, ("Lab 3", None, "Labs"))
+    assert lookup.lookup("Lab 7", None, CATEGORIES) is None
+
+    save(lookup, 3, ("Lab 4", None, "Labs"))
+    category, _, reasons = lookup.lookup("Lab 7", None, CATEGORIES)
+    assert category == "Labs"
+    assert reasons == ["template_history:3_of_3_saved"]
+
+def test_too_few_name_votes_fall_back_to_the_template():
+    lookup = CategoryLookup()
+    for voter in (1, 2, 3):
+        save(lookup, voter, (f"Lab {voter}", None, "Labs"))
+    assert lookup.lookup("Lab 1", None, CATEGORIES)[0] == "Labs"
+
+def test_split_series_gets_no_template_vote():
+    lookup = CategoryLookup()
+    for voter in (1, 2, 3):
+        save(lookup, voter, ("Lab 1", None, "Labs"), ("Lab 2", None, "Homework"))
+    assert lookup.lookup("Lab 9", None, CATEGORIES) is None
+    assert lookup.lookup("Lab 2", None, CATEGORIES)[0] == "Homework"
+
+def test_snapshot_keeps_voters_without_user_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(category_lookup, "PERSIST_VOTERS", True)
+    path = tmp_path / "lookup.json"
+    lookup = CategoryLookup()
+    save(lookup, 4217, ("Reflection", None, "Homework"))
+    lookup.save_snapshot(str(path))
+
+    snapshot = json.loads(path.read_text())
+    assert len(snapshot["voters"]) == 2
+    assert "4217" not in path.read_text()
+
+    loaded = CategoryLookup()
+    assert loaded.load_snapshot(str(path))
+    save(loaded, 4217, ("Reflection", None, "Homework"))
+    assert loaded.lookup("Reflection", None, CATEGORIES) is None
+    save(loaded, 2, ("Reflection", None, "Homework"))
+    assert loaded.lookup("Reflection", None, CATEGORIES)[0] == "Homework"
+
+def test_voters_not_saved_without_a_secret(tmp_path, monkeypatch):
+    monkeypatch.setattr(category_lookup, "PERSIST_VOTERS", False)
+    path = tmp_path / "lookup.json"
+    lookup = CategoryLookup()
+    save(lookup, 4217, ("Reflection", None, "Homework"))
+    lookup.save_snapshot(str(path))
+
+    assert json.loads(path.read_text())["voters"] == []
+
+def test_votes_added_during_a_rebuild_survive_replace():
+    lookup = CategoryLookup()
+    lookup.begin_rebuild()
+    save(lookup, 1, ("Reflection", None, "Homework"))
+    save(lookup, 2, ("Reflection", None, "Homework"))
+
+    # The rebuild already read user 1's save, replaying it doesn't count it twice
+    fresh = CategoryLookup()
+    save(fresh, 1, ("Reflection", None, "Homework"))
+    lookup.replace(fresh)
+
+    assert lookup.get_stats()["votes"] == 2
+    assert lookup.lookup("Reflection", None, CATEGORIES)[0] == "Homework"
+
+    # Recording stops with the swap
+    lookup.replace(CategoryLookup())
+    assert lookup.get_stats()["votes"] == 0
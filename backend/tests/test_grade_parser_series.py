@@ -0,0 +1,68 @@
+"""
+Numbered series in the OpenAI fallback of the parser: one request per series, without buffering a long series.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("passlib")
+
+from app.services import grade_parser
+from app.services.adaptive_batcher import AdaptiveBatcher
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+ROWS = 2000
+
+class FakeCategorizer:
+    """Answers every assignment with Homework and records what was sent"""
+    client = object()
+
+    def __init__(self):
+        self.batcher = AdaptiveBatcher()
+        self.sent = []
+
+    async def suggest_categories_batch(self, assignments, available_categories, deadline=None):
+        self.sent.extend(assignments)
+        return [("Homework", 0.9, ["fake"]) for _ in assignments]
+
+@pytest.fixture
+def categorizer(monkeypatch):
+    categorizer = FakeCategorizer()
+    monkeypatch.setattr(grade_parser, "openai_categorizer", categorizer)
+    return categorizer
+
+def series_rows():
+    return [f"Reading Response {i}\nGraded\n{i % 10}\n/10\n" for i in range(1, ROWS + 1)]
+
+def test_long_series_is_streamed_in_bounded_batches(categorizer):
+    consumed = 0
+
+    async def chunks():
+        nonlocal consumed
+        for row in series_rows():
+            consumed += 1
+            yield row.encode()
+
+    async def run():
+        first_answer_at = None
+        assignments = []
+        async for assignment in grade_parser.stream_blackboard_grades(chunks(), CATEGORIES):
+            if first_answer_at is None:
+                first_answer_at = consumed
+            assignments.append(assignment)
+        return first_answer_at, assignments
+
+    first_answer_at, assignments = asyncio.run(run())
+
+    assert len(assignments) == ROWS
+    assert all(assignment.suggested_category == "Homework" for assignment in assignments)
+    # Answers start flowing long before the end of the paste
+    assert first_answer_at <= grade_parser.SERIES_SLOT_MAX_MEMBERS * (categorizer.batcher.target_size() + 1) + 1
+    assert len(categorizer.sent) < ROWS / grade_parser.SERIES_SLOT_MAX_MEMBERS
+
+def test_series_members_share_one_answer(categorizer):
+    assignments = asyncio.run(grade_parser.parse_blackboard_grades("".join(series_rows()), CATEGORIES))
+
+    assert len(assignments) == ROWS
+    assert all(assignment.suggested_category == "Homework" for assignment in assignments)
+    assert len(categorizer.sent) <= ROWS / grade_parser.SERIES_SLOT_MAX_MEMBERS
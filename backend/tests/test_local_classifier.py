@@ -0,0 +1,79 @@
+"""
+Training, thresholds and persistence of the local naive Bayes classifier.
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import local_classifier
+from app.services.local_classifier import MIN_CLASS_EXAMPLES, LocalClassifier
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+
+def synthetic_examples():
+    examples = []
+    for i in range(1, MIN_CLASS_EXAMPLES + 11):
+        examples.append((f"Homework {i}", "Assignment", "Homework"))
+        examples.append((f"Problem Set {i}", None, "Homework"))
+        examples.append((f"Quiz {i}", "Quiz", "Quizzes"))
+        examples.append((f"Reading Quiz {i}", None, "Quizzes"))
+        examples.append((f"Midterm Exam {i}", "Test", "Exams"))
+        examples.append((f"Final Exam {i}", "Test", "Exams"))
+    # Too few examples to get a class
+    examples += [("Lab Report", None, "Labs")] * 3
+    return examples
+
+@pytest.fixture(scope="module")
+def classifier():
+    classifier = LocalClassifier()
+    classifier.train(synthetic_examples())
+    return classifier
+
+def test_answers_a_familiar_name(classifier):
+    assert sorted(classifier.classes) == ["exams", "homework", "quizzes"]
+    category, confidence, reasons = classifier.predict("Quiz 7", "Quiz", CATEGORIES)
+    assert category == "Quizzes"
+    assert confidence >= local_classifier.LOCAL_CLASSIFIER_MIN_CONFIDENCE
+    assert reasons == [f"local_model:{confidence}"]
+
+def test_declines_unfamiliar_names(classifier):
+    # Mostly n-grams never seen in training
+    assert classifier.predict("Zygote xylophone", None, CATEGORIES) is None
+
+def test_declines_below_the_confidence_threshold(classifier, monkeypatch):
+    assert classifier.predict("Quiz 7", "Quiz", CATEGORIES) is not None
+    monkeypatch.setattr(local_classifier, "LOCAL_CLASSIFIER_MIN_CONFIDENCE", 1.01)
+    assert classifier.predict("Quiz 7", "Quiz", CATEGORIES) is None
+
+def test_declines_without_two_known_categories(classifier):
+    assert classifier.predict("Quiz 7", "Quiz", ["Quizzes", "Labs"]) is None
+    assert classifier.predict("Quiz 7", "Quiz", ["Participation", "Labs"]) is None
+
+def test_unknown_available_categories_lower_the_confidence(classifier):
+    known_only = classifier.predict("Quiz 7", "Quiz", ["Quizzes", "Homework"])
+    assert known_only is not None
+    # Half of the available categories have no class, the answer can't be trusted
+    assert classifier.predict("Quiz 7", "Quiz", ["Quizzes", "Homework", "Labs", "Participation"]) is None
+
+def test_save_and_load_round_trip(classifier, tmp_path):
+    path = str(tmp_path / "model.npz")
+    classifier.save(path)
+
+    loaded = LocalClassifier()
+    assert loaded.load(path)
+    assert loaded.classes == classifier.classes
+    for name, assignment_type in [("Quiz 7", "Quiz"), ("Homework 3", None), ("Zygote xylophone", None)]:
+        assert loaded.predict(name, assignment_type, CATEGORIES) == classifier.predict(name, assignment_type, CATEGORIES)
+
+def test_load_rejects_another_feature_space(classifier, tmp_path, monkeypatch):
+    path = str(tmp_path / "model.npz")
+    classifier.save(path)
+
+    monkeypatch.setattr(local_classifier, "FEATURE_BUCKETS", local_classifier.FEATURE_BUCKETS * 2)
+    loaded = LocalClassifier()
+    assert not loaded.load(path)
+    assert not loaded.is_loaded
+    assert loaded.predict("Quiz 7", "Quiz", CATEGORIES) is None
+
+def test_missing_model_is_not_loaded(tmp_path):
+    assert not LocalClassifier().load(str(tmp_path / "missing.npz"))
@@ -0,0 +1,86 @@
+"""
+Circuit breaker accounting of OpenAI calls against the local mock server.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.openai_integration import OpenAICategorizer
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+
+class CountingRateLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+
+def make_categorizer(tmp_path, breaker, rate_limiter):
+    categorizer = OpenAICategorizer(api_key="test", cache_dir=str(tmp_path), rate_limiter=rate_limiter)
+    categorizer.circuit_breaker = breaker
+    return categorizer
+
+def categorize(categorizer, name, deadline_seconds=None):
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+    return categorizer.suggest_categories_batch([(name, None)], CATEGORIES, deadline=deadline)
+
+def test_open_breaker_takes_no_rate_limit_token(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    rate_limiter = CountingRateLimiter()
+    categorizer = make_categorizer(tmp_path, breaker, rate_limiter)
+
+    async def run():
+        try:
+            return await categorize(categorizer, "Topic a")
+        finally:
+            await categorizer.aclose()
+            categorizer.close()
+
+    assert asyncio.run(run()) == [(None, 0.0, ["circuit_open"])]
+    assert rate_limiter.acquired == 0
+
+def test_caller_deadline_is_not_a_provider_failure(tmp_path, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+
+    async def run():
+        async with MockOpenAIServer(latency=0.5) as server:
+            monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+            categorizer = make_categorizer(tmp_path, breaker, CountingRateLimiter())
+            try:
+                late = await categorize(categorizer, "Topic a", deadline_seconds=0.05)
+                on_time = await categorize(categorizer, "Topic b", deadline_seconds=5)
+            finally:
+                await categorizer.aclose()
+                categorizer.close()
+        return late, on_time
+
+    late, on_time = asyncio.run(run())
+    assert late == [(None, 0.0, ["deadline_exceeded"])]
+    assert breaker.is_closed
+    assert on_time[0][0] == "Homework"
+
+def test_provider_errors_open_the_breaker(tmp_path, monkeypatch):
+    # Nothing listens on the discard port, every call fails to connect
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    categorizer = make_categorizer(tmp_path, breaker, CountingRateLimiter())
+    categorizer.max_retries = 0
+
+    async def run():
+        try:
+            return await categorize(categorizer, "Topic a")
+        finally:
+            await categorizer.aclose()
+            categorizer.close()
+
+    result = asyncio.run(run())
+    assert result[0][2][0].startswith("api_error")
+    assert breaker.state == "open"
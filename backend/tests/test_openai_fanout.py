@@ -0,0 +1,19 @@
+"""
+Fan-out of concurrent categorizations against the local mock OpenAI server.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+
+from benchmarks.openai_fanout import run_fanout
+
+def test_concurrent_calls_overlap(monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", "")
+    report = asyncio.run(run_fanout(calls=300, latency=0.1))
+
+    assert report["categorized"] == 300
+    # Serially this would take 30 seconds, concurrent calls share the latency
+    assert report["max_in_flight"] > 50
+    assert report["elapsed_seconds"] < report["serial_seconds"] / 4
@@ -0,0 +1,113 @@
+"""
+Single-flight coalescing of concurrent categorizations of the same assignments, against the local mock server.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from app.services.openai_integration import OpenAICategorizer
+from benchmarks.mock_openai_server import MockOpenAIServer
+
+CATEGORIES = ["Homework", "Quizzes", "Exams"]
+ASSIGNMENT = [("Topic a", None)]
+
+class NoRateLimit:
+    async def acquire(self):
+        pass
+
+def make_categorizer(tmp_path):
+    return OpenAICategorizer(api_key="test", cache_dir=str(tmp_path), rate_limiter=NoRateLimit())
+
+def deadline_in(seconds):
+    return time.monotonic() + seconds
+
+async def close(categorizer):
+    await categorizer.aclose()
+    categorizer.close()
+
+def test_concurrent_callers_share_one_call(tmp_path, monkeypatch):
+    async def run():
+        async with MockOpenAIServer(latency=0.2) as server:
+            monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+            categorizer = make_categorizer(tmp_path)
+            try:
+                results = await asyncio.gather(*(
+                    categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES) for _ in range(20)
+                ))
+                return results, server.requests, categorizer.get_cache_stats()
+            finally:
+                await close(categorizer)
+
+    results, requests, stats = asyncio.run(run())
+    assert requests == 1
+    assert all(result[0][0] == "Homework" for result in results)
+    assert stats["coalesced"] == 19
+    assert stats["inflight"] == 0
+
+def test_waiters_share_the_failure_of_the_call(tmp_path, monkeypatch):
+    # Nothing listens on the discard port, the shared call fails to connect
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")
+
+    async def run():
+        categorizer = make_categorizer(tmp_path)
+        categorizer.max_retries = 0
+        try:
+            results = await asyncio.gather(*(
+                categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES) for _ in range(3)
+            ))
+            # Failures aren't cached, the next request tries again
+            return results, categorizer.get_cache_stats()
+        finally:
+            await close(categorizer)
+
+    results, stats = asyncio.run(run())
+    assert all(result[0][0] is None and result[0][2][0].startswith("api_error") for result in results)
+    assert stats["inflight"] == 0
+    assert stats["cache_size"] == 0
+
+def test_owner_deadline_doesnt_cut_short_a_waiter(tmp_path, monkeypatch):
+    async def run():
+        async with MockOpenAIServer(latency=0.5) as server:
+            monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+            categorizer = make_categorizer(tmp_path)
+            try:
+                owner = asyncio.create_task(
+                    categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES, deadline=deadline_in(0.1))
+                )
+                await asyncio.sleep(0)
+                waiter = categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES, deadline=deadline_in(5))
+                return await owner, await waiter, server.requests
+            finally:
+                await close(categorizer)
+
+    owner, waiter, requests = asyncio.run(run())
+    assert owner == [(None, 0.0, ["deadline_exceeded"])]
+    assert waiter[0][0] == "Homework"
+    assert requests == 1
+
+def test_cancelled_owner_leaves_the_call_running(tmp_path, monkeypatch):
+    async def run():
+        async with MockOpenAIServer(latency=0.3) as server:
+            monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+            categorizer = make_categorizer(tmp_path)
+            try:
+                owner = asyncio.create_task(categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES))
+                await asyncio.sleep(0)
+                waiter = asyncio.create_task(categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES))
+                await asyncio.sleep(0.05)
+                owner.cancel()
+                result = await waiter
+                # The result was cached for later requests too
+                cached = await categorizer.suggest_categories_batch(ASSIGNMENT, CATEGORIES)
+                return owner.cancelled(), result, cached, server.requests
+            finally:
+                await close(categorizer)
+
+    owner_cancelled, result, cached, requests = asyncio.run(run())
+    assert owner_cancelled
+    assert result[0][0] == "Homework"
+    assert cached == result
+    assert requests == 1
@@ -0,0 +1,40 @@
+"""
+Fallback of the shared OpenAI rate limiter to a local bucket while Redis fails.
+"""
+import time
+
+from app.services.token_bucket import TokenBucketRateLimiter
+
+class FlakyRedis:
+    """Runs the token script as a counter, raising while `down` is set"""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    def register_script(self, script):
+        def run(keys, args):
+            self.calls += 1
+            if self.down:
+                raise ConnectionError("redis down")
+            return "0"
+        return run
+
+def test_redis_is_retried_after_the_backoff():
+    redis = FlakyRedis()
+    limiter = TokenBucketRateLimiter(redis, rate_per_minute=6000, burst=100, redis_retry_seconds=0.05)
+
+    redis.down = True
+    assert limiter._take() == 0
+    assert limiter.get_stats()["backend"] == "local"
+
+    # Within the backoff the local bucket answers without touching Redis
+    redis.down = False
+    limiter._take()
+    assert redis.calls == 1
+
+    time.sleep(0.06)
+    assert limiter._take() == 0
+    assert redis.calls == 2
+    assert limiter.get_stats()["backend"] == "redis"
+    assert limiter.get_stats()["redis_failures"] == 1
@@ -0,0 +1,71 @@
+"""
+Per-user category index kept in line with the user's saved calculations.
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+fakeredis = pytest.importorskip("fakeredis")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.database.models import Category, SavedCalculation
+from app.services.user_category_index import UserCategoryIndex, index_field
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def index():
+    return UserCategoryIndex(fakeredis.FakeRedis(decode_responses=True))
+
+def save(db, user_id, categories):
+    calculation = SavedCalculation(user_id=user_id, name="calc", raw_data="", results={})
+    db.add(calculation)
+    db.flush()
+    for category, names in categories.items():
+        db.add(Category(calculation_id=calculation.id, name=category, weight=50,
+                        assignments=[{"name": name} for name in names]))
+    db.commit()
+    return calculation
+
+def test_rebuild_drops_assignments_removed_or_moved(db, index):
+    calculation = save(db, 7, {"Homework": ["Essay A", "Reflection"], "Quizzes": ["Pop Quiz"]})
+    assert index.load(7, db) == {
+        index_field("Essay A", None): "Homework",
+        index_field("Reflection", None): "Homework",
+        index_field("Pop Quiz", None): "Quizzes"
+    }
+    version = index.cache_scope(7, {"x": "y"})
+
+    # Edited: "Essay A" removed, "Reflection" moved
+    for category in calculation.categories:
+        if category.name == "Homework":
+            category.assignments = []
+        else:
+            category.assignments = [{"name": "Pop Quiz"}, {"name": "Reflection"}]
+    db.commit()
+    index.rebuild(7, db)
+
+    assert index.load(7, db) == {
+        index_field("Reflection", None): "Quizzes",
+        index_field("Pop Quiz", None): "Quizzes"
+    }
+    assert index.cache_scope(7, {"x": "y"}) != version
+
+def test_rebuild_after_delete_empties_the_index(db, index):
+    calculation = save(db, 7, {"Homework": ["Essay A"]})
+    assert index.load(7, db)
+
+    db.query(Category).filter(Category.calculation_id == calculation.id).delete()
+    db.delete(calculation)
+    db.commit()
+    index.rebuild(7, db)
+
+    assert index.load(7, db) == {}